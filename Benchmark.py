@@ -0,0 +1,233 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from Bitboard import Bitboard
+from Board import Board, lineString
+from FiveInRow import FiveInRow
+from FiveInRowPlayers import RandomPlayer, ShallowAiPlayer
+from GameRecord import readGames, replayPositions
+from MinimaxPlayer import MinimaxPlayer, MinimaxStatus
+
+CORPUS_SIZE = 50
+CORPUS_STONES = 40
+CORPUS_SEED = 1
+SEARCH_POSITIONS = 5
+SEARCH_DEPTH = 2
+LARGE_BOARD_SIZE = 50
+
+def randomPositions(count, stones=40, size=15, seed=1):
+    """Return boards with marks scattered around the centre like in a mid-game"""
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(count):
+        board = Board(size)
+        spread = max(2, size // 3)
+        placed = 0
+        while placed < stones:
+            x = min(size - 1, max(0, int(rng.gauss(size / 2, spread))))
+            y = min(size - 1, max(0, int(rng.gauss(size / 2, spread))))
+            if board.get(x, y) == 0:
+                board.set(x, y, 1 + placed % 2)
+                placed += 1
+        positions.append(board)
+    return positions
+
+def archivePositions(path, count, stones=40):
+    """Return the positions with the number of stones from the first games
+    of a game archive that are that long"""
+    positions = []
+    for board, _, _ in replayPositions(readGames(path), stones + 1):
+        if board.count() == stones:
+            positions.append(board.copy())
+            if len(positions) == count:
+                break
+    return positions
+
+def callsPerSecond(function, args, minTime=0.5):
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for arg in args:
+            function(*arg)
+        calls += len(args)
+        elapsed = time.perf_counter() - start
+        if elapsed >= minTime:
+            return calls / elapsed
+
+def stringCountPatterns(status, board):
+    counts = [0] * 10
+    for line in board.lines():
+        for i, count in enumerate(status.evaluateLine(lineString(line))):
+            counts[i] += count
+    return counts
+
+def benchPatternCounting(positions):
+    """Full board pattern counts per second with str.count scans and with bitboards"""
+    status = MinimaxStatus(Board(positions[0].size), 0)
+    bitboards = [Bitboard.fromBoard(board) for board in positions]
+
+    strings = callsPerSecond(stringCountPatterns, [(status, board) for board in positions])
+    bits = callsPerSecond(Bitboard.countPatterns, [(bitboard,) for bitboard in bitboards])
+    wins = callsPerSecond(Bitboard.winsAt, [(bitboard, x, y) for bitboard, board in
+        zip(bitboards, positions) for x, y, _ in board.marks()[:5]])
+
+    return {
+        "stringCountPerSec": strings,
+        "bitboardCountPerSec": bits,
+        "bitboardSpeedup": bits / strings,
+        "bitboardWinsAtPerSec": wins,
+    }
+
+def gameAt(board, player1=None, player2=None):
+    """A game with the marks of the board and player1 to move"""
+    game = FiveInRow(player1 or RandomPlayer(), player2 or RandomPlayer(), board.size)
+    for x, y, mark in board.marks():
+        game.setBoardPos(x, y, mark)
+    game.turn = board.count()
+    for player in game.players: player.setGame(game)
+    return game
+
+def searchPosition(player, board, depth):
+    player.nodeNo = 0
+    player.gameStatus = MinimaxStatus(board, 0)
+    player.setNumber(1 + board.count() % 2)
+    player.searchRoot(depth)
+    return player.nodeNo
+
+def benchSearch(positions, depth=SEARCH_DEPTH):
+    """Minimax nodes per second, and the peak memory allocated by a search
+    on top of the preallocated transposition table"""
+    player = MinimaxPlayer(depth)
+    nodes = 0
+    elapsed = 0.0
+    for board in positions:
+        player.transpTable.clear()
+        start = time.perf_counter()
+        nodes += searchPosition(player, board, depth)
+        elapsed += time.perf_counter() - start
+
+    #traced separately, tracing allocations slows down the search
+    peak = 0
+    tracemalloc.start()
+    for board in positions:
+        player.transpTable.clear()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        searchPosition(player, board, depth)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    return {
+        "minimaxNodesPerSec": nodes / elapsed,
+        "searchPeakBytes": peak,
+    }
+
+def benchEvaluation(positions):
+    """Calls per second of the static evaluation and of the referee win check"""
+    statuses = [MinimaxStatus(board, 0) for board in positions]
+    games = [gameAt(board) for board in positions]
+
+    return {
+        "getScorePerSec": callsPerSecond(MinimaxStatus.getScore, [(status, True) for status in statuses]),
+        "checkWinPerSec": callsPerSecond(FiveInRow.checkWin, [(game, game.board, x, y)
+            for game, board in zip(games, positions) for x, y, _ in board.marks()[:5]]),
+    }
+
+def benchShallowAi(positions):
+    players = []
+    for board in positions:
+        player = ShallowAiPlayer()
+        gameAt(board, player)
+        players.append(player)
+
+    return {
+        "shallowAiMovesPerSec": callsPerSecond(ShallowAiPlayer.requestMove, [(player,) for player in players]),
+    }
+
+def centred(board, size):
+    """Return the board in the middle of a larger one"""
+    large = Board(size)
+    offset = (size - board.size) // 2
+    for x, y, mark in board.marks():
+        large.set(x + offset, y + offset, mark)
+    return large
+
+def benchLargeBoard(positions, size=LARGE_BOARD_SIZE):
+    """Search and ShallowAiPlayer rates with the positions on a large board,
+    where only the area near the marks should cost time"""
+    large = [centred(board, size) for board in positions]
+    return {
+        "largeBoardMinimaxNodesPerSec": benchSearch(large[:SEARCH_POSITIONS])["minimaxNodesPerSec"],
+        "largeBoardShallowAiMovesPerSec": benchShallowAi(large)["shallowAiMovesPerSec"],
+    }
+
+def runBenchmarks(corpus=None):
+    if corpus:
+        positions = archivePositions(corpus, CORPUS_SIZE, CORPUS_STONES)
+    else:
+        positions = randomPositions(CORPUS_SIZE, CORPUS_STONES, seed=CORPUS_SEED)
+    results = {}
+    results.update(benchSearch(positions[:SEARCH_POSITIONS]))
+    results.update(benchEvaluation(positions))
+    results.update(benchShallowAi(positions))
+    results.update(benchPatternCounting(positions))
+    results.update(benchLargeBoard(positions))
+    return results
+
+def lowerIsBetter(name):
+    return name.endswith("Bytes")
+
+def isMeasurement(name):
+    """Ratios of other results are not compared against the baseline"""
+    return name.endswith("PerSec") or name.endswith("Bytes")
+
+def compare(results, baseline, tolerance=0.2):
+    """Return (name, value, baseline value) of the results that are worse
+    than the baseline by more than the tolerance"""
+    regressions = []
+    for name, value in results.items():
+        old = baseline.get(name)
+        if not old or not isMeasurement(name):
+            continue
+        ratio = old / value if lowerIsBetter(name) else value / old
+        if ratio < 1 - tolerance:
+            regressions.append((name, value, old))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine on a fixed corpus of mid-game positions")
+    parser.add_argument("-o", "--output", help="write the results to a JSON file")
+    parser.add_argument("-b", "--baseline", help="JSON results to compare against")
+    parser.add_argument("-t", "--tolerance", type=float, default=0.2,
+        help="allowed relative slowdown before a result counts as a regression")
+    parser.add_argument("-c", "--corpus", help="take the positions from a game archive instead of random ones")
+    args = parser.parse_args(argv)
+
+    results = runBenchmarks(args.corpus)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    for name, value in results.items():
+        line = "%-24s %14.1f" % (name, value)
+        if baseline and baseline.get(name):
+            line += "  %6.2fx" % (value / baseline[name])
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, value, old in regressions:
+            print("regression: %s %.1f, baseline %.1f" % (name, value, old))
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
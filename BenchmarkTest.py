@@ -0,0 +1,23 @@
+import unittest
+from Benchmark import compare, gameAt, randomPositions
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_corpus(self):
+        positions = randomPositions(3, stones=20)
+        self.assertEqual(positions, randomPositions(3, stones=20))
+        self.assertEqual([board.count() for board in positions], [20, 20, 20])
+
+        game = gameAt(positions[0])
+        self.assertEqual(game.board, positions[0])
+        self.assertEqual(game.turn, 20)
+
+    def test_compare(self):
+        baseline = {"getScorePerSec": 1000.0, "searchPeakBytes": 1000, "bitboardSpeedup": 6.0}
+
+        self.assertEqual(compare({"getScorePerSec": 900.0, "searchPeakBytes": 1100}, baseline), [])
+        self.assertEqual(compare({"getScorePerSec": 700.0, "searchPeakBytes": 1500, "bitboardSpeedup": 1.0}, baseline),
+            [("getScorePerSec", 700.0, 1000.0), ("searchPeakBytes", 1500, 1000)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+from Patterns import WIN_LENGTH, P1, P2, playerPattern, overlaps, winPatterns
+
+class Bitboard:
+    """Marks of each player as the bits of one integer.
+
+    Cell (x, y) is bit y*(size+1) + x. The extra column is never set, so
+    shifting a line of marks past the board edge cannot wrap it to the
+    next row. Shifting right by one of self.shifts moves each cell one
+    step back along a row, column, diagonal or anti-diagonal, in the same
+    order in which MinimaxStatus reads the lines."""
+
+    def __init__(self, size=15, winLength=WIN_LENGTH):
+        self.size = size
+        self.winLength = winLength
+        self.width = size + 1
+        self.marks = [0, 0, 0]
+
+        row = (1 << size) - 1
+        self.full = 0
+        for y in range(size):
+            self.full |= row << (y * self.width)
+
+        self.shifts = (1, self.width, self.width + 1, self.width - 1)
+
+        #pattern strings compiled to (offset, mark) pairs, and their overlap offsets
+        self.patterns = []
+        for player, base in [(1, P1), (2, P2)]:
+            for index, patterns in winPatterns(winLength):
+                for pattern in patterns:
+                    pattern = playerPattern(pattern, player)
+                    self.patterns.append((base + index, list(enumerate(map(int, pattern))), overlaps(pattern)))
+
+    @classmethod
+    def fromBoard(cls, board, winLength=WIN_LENGTH):
+        bitboard = cls(board.size, winLength)
+        for x, y, mark in board.marks():
+            bitboard.place(x, y, mark)
+        return bitboard
+
+    def bit(self, x, y):
+        return 1 << (y * self.width + x)
+
+    def place(self, x, y, player):
+        self.marks[player] |= self.bit(x, y)
+
+    def remove(self, x, y, player):
+        self.marks[player] &= ~self.bit(x, y)
+
+    def cells(self, mark):
+        """Bits of the cells holding the mark, 0 meaning empty cells"""
+        if mark == 0:
+            return self.full & ~(self.marks[1] | self.marks[2])
+        return self.marks[mark]
+
+    def matches(self, pattern, shift, cells=None):
+        """Bits of the cells where the pattern starts in the given direction"""
+        if cells is None:
+            cells = [self.cells(mark) for mark in range(3)]
+        starts = self.full
+        for offset, mark in pattern:
+            starts &= cells[mark] >> (offset * shift)
+        return starts
+
+    def countPatterns(self):
+        """Count the patterns of both players on the whole board.
+
+        The counts equal the sums of MinimaxStatus.evaluateLine over all
+        lines: like str.count, an occurrence overlapping an earlier counted
+        one on the same line is skipped."""
+        counts = [0] * 10
+        cells = [self.cells(mark) for mark in range(3)]
+        for index, pattern, periods in self.patterns:
+            for shift in self.shifts:
+                starts = self.matches(pattern, shift, cells)
+                if starts:
+                    counts[index] += self.countStarts(starts, [p * shift for p in periods])
+        return counts
+
+    def countStarts(self, starts, overlapShifts):
+        """Count occurrences that str.count would find scanning a line from the start"""
+        count = 0
+        while starts:
+            #occurrences with no overlapping occurrence left before them are counted,
+            #the ones they overlap with are dropped
+            first = starts
+            for shift in overlapShifts:
+                first &= ~(starts << shift)
+
+            count += first.bit_count()
+            dropped = first
+            for shift in overlapShifts:
+                dropped |= first << shift
+            starts &= ~dropped
+        return count
+
+    def fives(self, player, shift):
+        marks = self.marks[player]
+        starts = marks
+        for k in range(1, self.winLength):
+            starts &= marks >> (k * shift)
+        return starts
+
+    def hasFive(self, player):
+        return any(self.fives(player, shift) for shift in self.shifts)
+
+    def winsAt(self, x, y):
+        """Whether the mark at (x, y) is part of a winning row"""
+        bit = self.bit(x, y)
+        player = 1 if self.marks[1] & bit else 2 if self.marks[2] & bit else 0
+        if player == 0:
+            return False
+
+        for shift in self.shifts:
+            #a winning row through the cell starts at most winLength - 1 steps before it
+            cover = bit
+            for k in range(1, self.winLength):
+                cover |= bit >> (k * shift)
+            if self.fives(player, shift) & cover:
+                return True
+
+        return False
@@ -0,0 +1,67 @@
+import random
+import unittest
+from Bitboard import Bitboard
+from Board import Board, lineString
+from MinimaxPlayer import MinimaxStatus
+
+def checkWinByWalking(board, x0, y0, winLength=5):
+    mark = board.get(x0, y0)
+    for dx, dy in [(1, 0), (0, 1), (1, 1), (1, -1)]:
+        marksInRow = 1
+        for sign in [1, -1]:
+            x, y = x0 + sign * dx, y0 + sign * dy
+            while board.onBoard(x, y) and board.get(x, y) == mark:
+                marksInRow += 1
+                x, y = x + sign * dx, y + sign * dy
+        if marksInRow >= winLength:
+            return True
+    return False
+
+class BitboardTest(unittest.TestCase):
+
+    def randomBoard(self, rng, size):
+        board = Board(size)
+        for _ in range(rng.randint(0, size * size)):
+            board.set(rng.randrange(size), rng.randrange(size), rng.randint(1, 2))
+        return board
+
+    def test_countPatterns(self):
+        rng = random.Random(3)
+
+        for winLength in [5, 6]:
+            ms = MinimaxStatus([[0] * 7] * 7, 0, winLength=winLength)
+            for size in [5, 7, 15]:
+                for _ in range(30):
+                    board = self.randomBoard(rng, size)
+
+                    counts = [0] * 10
+                    for line in board.lines():
+                        for i, count in enumerate(ms.evaluateLine(lineString(line))):
+                            counts[i] += count
+
+                    self.assertEqual(Bitboard.fromBoard(board, winLength).countPatterns(), counts)
+
+    def test_overlappingPatterns(self):
+        board = Board(15)
+        for x in [1, 2, 3, 5, 6, 7, 9, 10, 11]:
+            board.set(x, 0, 1)
+
+        #like str.count on "011101110111000", the middle "01110" overlaps the first one
+        counts = Bitboard.fromBoard(board).countPatterns()
+        self.assertEqual(counts[3], 2)
+
+    def test_winsAt(self):
+        rng = random.Random(4)
+
+        for size, winLength in [(5, 5), (9, 5), (15, 5), (9, 6), (15, 7)]:
+            for _ in range(30):
+                board = self.randomBoard(rng, size)
+                bitboard = Bitboard.fromBoard(board, winLength)
+
+                for x, y, _ in board.marks():
+                    self.assertEqual(bitboard.winsAt(x, y), checkWinByWalking(board, x, y, winLength))
+                self.assertEqual(bitboard.hasFive(1) or bitboard.hasFive(2),
+                    any(checkWinByWalking(board, x, y, winLength) for x, y, _ in board.marks()))
+
+if __name__ == '__main__':
+    unittest.main()
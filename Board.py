@@ -0,0 +1,144 @@
+from functools import lru_cache
+import numpy as np
+
+#moves are packed with a byte per coordinate in transposition tables,
+#opening books and game archives, and archives keep the size in a byte
+MAX_SIZE = 255
+
+def checkSize(size):
+    if not 1 <= size <= MAX_SIZE:
+        raise ValueError("board size must be 1 to %d, got %d" % (MAX_SIZE, size))
+
+@lru_cache(maxsize=None)
+def boardLines(size):
+    """Return the cells of all rows, columns and diagonals, and for each cell
+    the (line index, offset) pairs of the four lines going through it"""
+    lines = []
+    for y in range(size):
+        lines.append([(x, y) for x in range(size)])
+
+    for x in range(size):
+        lines.append([(x, y) for y in range(size)])
+
+    for d in range(1 - size, size):
+        lines.append([(y + d, y) for y in range(size) if 0 <= y + d < size])
+
+    for s in range(2 * size - 1):
+        lines.append([(s - y, y) for y in range(size) if 0 <= s - y < size])
+
+    cellLines = [[[] for x in range(size)] for y in range(size)]
+    for i, line in enumerate(lines):
+        for offset, (x, y) in enumerate(line):
+            cellLines[y][x].append((i, offset))
+
+    return lines, cellLines
+
+@lru_cache(maxsize=None)
+def boardLineCells(size):
+    """Return the cells of each line of boardLines as indices y*size + x"""
+    return [[y * size + x for x, y in line] for line in boardLines(size)[0]]
+
+def lineString(line):
+    """Convert a line of marks to a string of digits like '0012'"""
+    return (line + ord('0')).tobytes().decode('ascii')
+
+#lines are also coded as ints with two bits per cell, the cell at offset k
+#at bits 2k, and a 1 bit after the last cell so that lines of different
+#lengths get different codes. Placing a mark adds mark << 2k to the code.
+def emptyLineCode(length):
+    return 1 << (2 * length)
+
+def lineCode(line):
+    """Convert a string of digits like '0012' to its line code"""
+    return int(line[::-1], 4) + emptyLineCode(len(line)) if line else 1
+
+#the digits of the four cells coded in each byte value
+BYTE_CELLS = ["".join("0123"[(byte >> k) & 3] for k in range(0, 8, 2)) for byte in range(256)]
+
+def codeString(code):
+    """Convert a line code back to a string of digits"""
+    length = (code.bit_length() - 1) // 2
+    data = code.to_bytes((code.bit_length() + 7) // 8, "little")
+    return "".join([BYTE_CELLS[byte] for byte in data])[:length]
+
+class Board:
+    """Square board of marks stored as an int8 array indexed [y, x].
+
+    0 is an empty cell, 1 and 2 are the marks of the players. Indexing the
+    board itself like board[y][x] works as with a list of rows."""
+
+    def __init__(self, size=15, cells=None):
+        self.size = size
+        self.cells = np.zeros((size, size), dtype=np.int8) if cells is None else cells
+
+    @classmethod
+    def fromRows(cls, rows):
+        if isinstance(rows, Board):
+            return rows.copy()
+        cells = np.array(rows, dtype=np.int8)
+        return cls(len(cells), cells)
+
+    def copy(self):
+        return Board(self.size, self.cells.copy())
+
+    def get(self, x, y):
+        return self.cells.item(y, x)
+
+    def set(self, x, y, mark):
+        self.cells[y, x] = mark
+
+    def onBoard(self, x, y):
+        return 0 <= x < self.size and 0 <= y < self.size
+
+    def row(self, y):
+        return self.cells[y]
+
+    def column(self, x):
+        return self.cells[:, x]
+
+    def diagonal(self, d):
+        """Cells with x - y == d, from top to bottom"""
+        return self.cells.diagonal(d)
+
+    def antiDiagonal(self, s):
+        """Cells with x + y == s, from top to bottom"""
+        return self.cells[:, ::-1].diagonal(self.size - 1 - s)
+
+    def lines(self):
+        """All rows, columns and diagonals in the order of boardLines"""
+        for y in range(self.size):
+            yield self.row(y)
+        for x in range(self.size):
+            yield self.column(x)
+        for d in range(1 - self.size, self.size):
+            yield self.diagonal(d)
+        for s in range(2 * self.size - 1):
+            yield self.antiDiagonal(s)
+
+    def emptyCells(self):
+        """(x, y) of empty cells, ordered by x and then by y"""
+        return [tuple(cell) for cell in np.argwhere(self.cells.T == 0).tolist()]
+
+    def marks(self):
+        """(x, y, mark) of occupied cells, ordered by x and then by y"""
+        xs, ys = np.nonzero(self.cells.T)
+        return list(zip(xs.tolist(), ys.tolist(), self.cells[ys, xs].tolist()))
+
+    def count(self):
+        return int(np.count_nonzero(self.cells))
+
+    def __getitem__(self, y):
+        return self.cells[y]
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        return isinstance(other, Board) and np.array_equal(self.cells, other.cells)
+
+    def __str__(self):
+        marks = ['.', 'X', 'O']
+        return '\n'.join([''.join([marks[item] for item in row]) for row in self.cells.tolist()])
@@ -0,0 +1,63 @@
+import random
+import unittest
+from Board import Board, MAX_SIZE, boardLines, checkSize, lineString
+from FiveInRow import FiveInRow
+from FiveInRowPlayers import RandomPlayer
+from MinimaxPlayer import MinimaxStatus
+
+class BoardTest(unittest.TestCase):
+
+    def randomBoard(self, size):
+        rng = random.Random(size)
+        return Board.fromRows([[rng.choice([0, 0, 1, 2]) for x in range(size)] for y in range(size)])
+
+    def test_lines(self):
+        for size in [1, 5, 15]:
+            board = self.randomBoard(size)
+            lines, cellLines = boardLines(size)
+            extracted = list(board.lines())
+
+            self.assertEqual(len(extracted), len(lines))
+            for line, cells in zip(extracted, lines):
+                self.assertEqual(line.tolist(), [board.get(x, y) for x, y in cells])
+
+            for y in range(size):
+                for x in range(size):
+                    for i, offset in cellLines[y][x]:
+                        self.assertEqual(lines[i][offset], (x, y))
+
+    def test_diagonals(self):
+        board = Board(5)
+        board.set(1, 0, 1)
+        board.set(4, 3, 2)
+        board.set(0, 3, 1)
+
+        self.assertEqual(lineString(board.diagonal(1)), "1002")
+        self.assertEqual(lineString(board.antiDiagonal(3)), "0001")
+        self.assertEqual(lineString(board.row(3)), "10002")
+        self.assertEqual(lineString(board.column(4)), "00020")
+
+    def test_cells(self):
+        board = Board.fromRows([[0, 1, 0], [2, 0, 0], [0, 0, 1]])
+
+        self.assertEqual(board.marks(), [(0, 1, 2), (1, 0, 1), (2, 2, 1)])
+        self.assertEqual(board.emptyCells(), [(0, 0), (0, 2), (1, 1), (1, 2), (2, 0), (2, 1)])
+        self.assertEqual(board[1][0], 2)
+        self.assertEqual(str(board), ".X.\nO..\n..X")
+
+        clone = board.copy()
+        clone.set(0, 0, 1)
+        self.assertEqual(board.get(0, 0), 0)
+        self.assertNotEqual(board, clone)
+
+    def test_checkSize(self):
+        checkSize(1)
+        checkSize(MAX_SIZE)
+        self.assertRaises(ValueError, checkSize, 0)
+        for size in [MAX_SIZE + 1, 300]:
+            self.assertRaises(ValueError, checkSize, size)
+            self.assertRaises(ValueError, FiveInRow, RandomPlayer(), RandomPlayer(), size)
+            self.assertRaises(ValueError, MinimaxStatus, Board(size), 0)
+
+if __name__ == '__main__':
+    unittest.main()
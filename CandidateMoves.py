@@ -0,0 +1,119 @@
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def neighbourhoods(size, radius):
+    """Return the cells within the radius of each cell, excluding the cell
+    itself, as table[y*size + x] = [(index, (x, y)), ...]"""
+    table = []
+    for y0 in range(size):
+        for x0 in range(size):
+            cells = []
+            for y in range(max(0, y0 - radius), min(size, y0 + radius + 1)):
+                for x in range(max(0, x0 - radius), min(size, x0 + radius + 1)):
+                    if (x, y) != (x0, y0):
+                        cells.append((y * size + x, (x, y)))
+            table.append(cells)
+    return table
+
+class CandidateMoves:
+    """The empty cells within a distance of any mark, by the larger of the
+    x and y distances.
+
+    Each cell keeps a count of the marks near it. The candidates are a list
+    with a dict of their positions in it, so adding and removing a cell
+    takes constant time: new cells are appended and a removed cell is
+    replaced with the last one. Undo reverses a place exactly, so the order
+    of the candidates only depends on the order of the moves."""
+
+    def __init__(self, size=15, radius=1):
+        self.size = size
+        self.radius = radius
+        self.neighbours = neighbourhoods(size, radius)
+        self.near = [0] * (size * size)
+        self.filled = bytearray(size * size)
+        self.marks = 0
+        self.moves = []
+        self.index = {}
+        self.history = []
+
+        #on an empty board the only candidate is the centre
+        mid = size // 2
+        self.first = [(mid, mid)]
+
+    def copy(self):
+        clone = CandidateMoves.__new__(CandidateMoves)
+        clone.__dict__.update(self.__dict__)
+        clone.near = self.near[:]
+        clone.filled = self.filled[:]
+        clone.moves = self.moves[:]
+        clone.index = self.index.copy()
+        clone.history = self.history[:]
+        return clone
+
+    def __contains__(self, move):
+        if self.marks == 0:
+            return move in self.first
+        return move in self.index
+
+    def __len__(self):
+        return len(self.moves) if self.marks else len(self.first)
+
+    def __iter__(self):
+        """Iterate the candidates, the ones added last first"""
+        return reversed(self.moves) if self.marks else iter(self.first)
+
+    def add(self, move):
+        self.index[move] = len(self.moves)
+        self.moves.append(move)
+
+    def remove(self, move):
+        """Remove the move and return its position, or -1 if it was not a candidate"""
+        i = self.index.pop(move, -1)
+        if i >= 0:
+            last = self.moves.pop()
+            if last != move:
+                self.moves[i] = last
+                self.index[last] = i
+        return i
+
+    def place(self, x0, y0):
+        """Update the candidates for a mark placed on (x0, y0)"""
+        cell = y0 * self.size + x0
+        removed = self.remove((x0, y0))
+        self.filled[cell] = 1
+        self.marks += 1
+
+        added = 0
+        near = self.near
+        for i, move in self.neighbours[cell]:
+            near[i] += 1
+            if near[i] == 1 and not self.filled[i]:
+                self.add(move)
+                added += 1
+
+        self.history.append((cell, removed, added))
+
+    def undo(self):
+        """Take back the latest place"""
+        cell, removed, added = self.history.pop()
+
+        for _ in range(added):
+            del self.index[self.moves.pop()]
+        near = self.near
+        for i, _ in self.neighbours[cell]:
+            near[i] -= 1
+
+        self.filled[cell] = 0
+        self.marks -= 1
+
+        if removed >= 0:
+            move = (cell % self.size, cell // self.size)
+            if removed < len(self.moves):
+                #move the cell that took its place back to the end
+                other = self.moves[removed]
+                self.index[other] = len(self.moves)
+                self.moves.append(other)
+                self.moves[removed] = move
+            else:
+                self.moves.append(move)
+            self.index[move] = removed
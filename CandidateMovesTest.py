@@ -0,0 +1,35 @@
+import random
+import unittest
+from CandidateMoves import CandidateMoves
+
+def nearbyCells(size, radius, filled):
+    return {(x, y) for x in range(size) for y in range(size) if (x, y) not in filled and
+        any(max(abs(x - fx), abs(y - fy)) <= radius for fx, fy in filled)}
+
+class CandidateMovesTest(unittest.TestCase):
+
+    def test_placeAndUndo(self):
+        rng = random.Random(6)
+
+        for size, radius in [(5, 1), (9, 2), (15, 1)]:
+            candidates = CandidateMoves(size, radius)
+            self.assertEqual(list(candidates), [(size // 2, size // 2)])
+
+            cells = [(x, y) for x in range(size) for y in range(size)]
+            rng.shuffle(cells)
+            states = []
+            for i, move in enumerate(cells):
+                states.append((list(candidates), dict(candidates.index)))
+                candidates.place(*move)
+
+                expected = nearbyCells(size, radius, cells[:i + 1])
+                self.assertEqual(set(candidates), expected)
+                self.assertEqual(len(candidates), len(expected))
+                self.assertNotIn(move, candidates)
+
+            while states:
+                candidates.undo()
+                self.assertEqual((list(candidates), dict(candidates.index)), states.pop())
+
+if __name__ == '__main__':
+    unittest.main()
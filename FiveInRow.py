@@ -1,14 +1,31 @@
+from Bitboard import Bitboard
+from Board import Board, checkSize
+from Patterns import WIN_LENGTH, checkWinLength
+from Referee import Referee
 from FiveInRowPlayers import *
 from MinimaxPlayer import MinimaxPlayer
-import threading
+import time
 
-class FiveInRow(threading.Thread):
+#invalid moves a player may try in one turn before losing the game
+MAX_INVALID_MOVES = 10
 
-    def __init__(self, player1, player2):
-        threading.Thread.__init__(self)
+class FiveInRow:
+    """The state and rules of one game. A game is played to the end with
+    play() or run(), or on an asyncio event loop with playAsync(), see
+    GameController for hosting many games in one process. A recorder, like
+    a GameRecord.GameWriter, gets the game when it ends.
 
-        self.size = 15
-        self.board = [x[:] for x in [[0] * self.size] * self.size]
+    A player that tries maxInvalidMoves invalid moves in one turn loses
+    the game, None allows any number like for human players."""
+
+    def __init__(self, player1, player2, size=15, winLength=WIN_LENGTH, recorder=None):
+        checkSize(size)
+        checkWinLength(winLength)
+        self.size = size
+        self.winLength = winLength
+        self.board = Board(self.size)
+        self.referee = Referee(self.size, winLength)
+        self.maxInvalidMoves = MAX_INVALID_MOVES
 
         player1.setNumber(1)
         player2.setNumber(2)
@@ -17,85 +34,130 @@ class FiveInRow(threading.Thread):
         for player in self.players: player.setGame(self)
         self.lastMove = None
         self.moves = []
+        self.moveTimes = []
+        self.winner = None
+        self.recorder = recorder
 
     def getBoardPos(self, x, y):
-        return self.board[y][x]
+        return self.board.get(x, y)
 
     def setBoardPos(self, x, y , mark):
-        self.board[y][x] = mark
+        self.referee.set(x, y, mark)
+        self.board.set(x, y, mark)
 
     def changeTurn(self):
         self.players = self.players[1], self.players[0]
 
     def onBoard(self, x, y):
-        return 0 <= x < self.size and 0 <= y < self.size
-
-    def checkWin(self, board, x0, y0):
-
-        directions = [
-            [1, 0], #horizontal
-            [0, 1], #vertical
-            [1, 1], #diagonal 1
-            [1, -1] #diagonal 2
-        ]
-
-        mark = board[y0][x0]
-
-        for direction in directions:
-            dx, dy = direction
-            x, y = x0, y0
-            marksInRow = 0
-
-            for _ in range(2):
-                while self.onBoard(x, y) and board[y][x] == mark:
-                    x += dx
-                    y += dy
-                    marksInRow += 1
+        return self.board.onBoard(x, y)
 
-                #check the negative direction also
-                dx *= -1
-                dy *= -1
-                x = x0 + dx
-                y = y0 + dy
-
-            if marksInRow >= 5:
-                return True
+    def playOpening(self, moves):
+        """Place the opening moves for the players in turn before the game starts"""
+        for move in moves:
+            self.setBoardPos(*move, self.players[0].number)
+            self.turn += 1
+            self.moves.append(move)
+            self.changeTurn()
+        for player in self.players: player.setGame(self)
 
-        return False
+    def checkWin(self, board, x0, y0):
+        if board is self.board:
+            return self.referee.winsAt(x0, y0)
+        return Bitboard.fromBoard(board, self.winLength).winsAt(x0, y0)
 
     def requestMove(self):
-        move = self.players[0].requestMove()
-        if not self.onBoard(*move):
+        return self.placeMove(self.players[0].requestMove())
+
+    async def requestMoveAsync(self, executor=None):
+        return self.placeMove(await self.players[0].requestMoveAsync(executor))
+
+    def placeMove(self, move):
+        """Place the move of the player in turn, return None if it is not valid"""
+        try:
+            x, y = move
+            valid = self.referee.isFree(x, y)
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
             return None
 
-        if self.getBoardPos(*move) == 0:
-            self.setBoardPos(*move, self.players[0].number)
-            self.turn += 1
-            self.lastMove = move
-            self.moves.append(move)
-            return move
-        return None
+        self.setBoardPos(x, y, self.players[0].number)
+        self.turn += 1
+        self.lastMove = move
+        self.moves.append(move)
+        return move
 
-    def tick(self):
+    def invalidMoveLimit(self, tries):
+        return self.maxInvalidMoves is not None and tries >= self.maxInvalidMoves
 
-        move = None
+    def tick(self):
+        start = time.perf_counter()
+        tries = 0
+        move = self.requestMove()
         while move is None:
+            tries += 1
+            if self.invalidMoveLimit(tries):
+                return self.forfeit()
             move = self.requestMove()
+        self.moveTimes.append(time.perf_counter() - start)
+        return self.endTurn(move)
 
-        if self.turn >= self.size**2:
+    async def tickAsync(self, executor=None):
+        start = time.perf_counter()
+        tries = 0
+        move = await self.requestMoveAsync(executor)
+        while move is None:
+            tries += 1
+            if self.invalidMoveLimit(tries):
+                return self.forfeit()
+            move = await self.requestMoveAsync(executor)
+        self.moveTimes.append(time.perf_counter() - start)
+        return self.endTurn(move)
+
+    def forfeit(self):
+        """End the game as lost by the player in turn, return False"""
+        self.players[0].notifyLoss()
+        self.players[1].notifyWin()
+        self.endGame(self.players[1].number)
+        return False
+
+    def endTurn(self, move):
+        """Notify the players of the result of the move and pass the turn,
+        return False if the game is over"""
+        if self.referee.isFull():
             #map(lambda p: p.notifyDraw(), self.players)
             for player in self.players: player.notifyDraw()
+            self.endGame(0)
             return False #game over
 
         if self.checkWin(self.board, *move):
             self.players[0].notifyWin()
             self.players[1].notifyLoss()
+            self.endGame(self.players[0].number)
             return False #game is over
 
         self.players[0].notifyMoveOk()
         self.changeTurn()
         return True #game continues
 
+    def endGame(self, winner):
+        self.winner = winner
+        if self.recorder is not None:
+            self.recorder.write(self)
+
+    def play(self):
+        """Play the game to the end without printing, return the winner or 0 for a draw"""
+        while self.tick():
+            pass
+        return self.winner
+
+    async def playAsync(self, executor=None):
+        """Play the game to the end on the running event loop, players that
+        are not coroutines think in the executor. Returns the winner."""
+        while await self.tickAsync(executor):
+            pass
+        return self.winner
+
     def run(self):
         while self.tick():
             print(self.turn)
@@ -103,8 +165,7 @@ class FiveInRow(threading.Thread):
         print(str(self))
 
     def __str__(self):
-        marks = ['.', 'X', 'O']
-        return '\n'.join([''.join([marks[item] for item in row]) for row in self.board])
+        return str(self.board)
 
 
 def main():
@@ -112,9 +173,9 @@ def main():
     p2 = HumanPlayer("Kaisa")
 
     game = FiveInRow(p1, p2)
+    game.maxInvalidMoves = None
 
-    game.start()
-    game.join()
+    game.run()
 
 if __name__ == "__main__":
     main()
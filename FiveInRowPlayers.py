@@ -1,5 +1,8 @@
+import asyncio
 import random
 from abc import ABC, abstractmethod
+from functools import lru_cache
+import numpy as np
 
 class FiveInRowPlayer(ABC):
     def __init__(self):
@@ -23,6 +26,12 @@ class FiveInRowPlayer(ABC):
     def requestMove(self):
         pass
 
+    async def requestMoveAsync(self, executor=None):
+        """Request a move without blocking the event loop. The blocking
+        requestMove runs in the executor, players waiting for input can
+        override this to wait for it on the loop instead."""
+        return await asyncio.get_running_loop().run_in_executor(executor, self.requestMove)
+
     def notifyInvalidMove(self):
         pass
 
@@ -83,22 +92,110 @@ class RandomPlayer(FiveInRowPlayer):
         b = random.randint(0, self.game.size - 1)
         return a,b
 
+#cell value outside the board in the line arrays of moveValues
+WALL = 3
+
+@lru_cache(maxsize=None)
+def lineIndices(size):
+    """Index arrays that lay the rows, columns, diagonals and anti-diagonals of
+    a board out as the lines of a (4, 2*size-1, size) array"""
+    y, x = np.indices((size, size))
+    directions = np.broadcast_to(np.arange(4).reshape(4, 1, 1), (4, size, size))
+    lines = np.stack([y, x, x - y + size - 1, x + y])
+    offsets = np.stack([x, y, x, x])
+    return (directions, lines, offsets), (y, x)
+
+def marksAhead(lines, mark):
+    """For each cell, count the marks met walking along the last axis towards
+    its end, until any other mark or a wall stops the walk. Empty cells are
+    walked over."""
+    isMark = lines == mark
+    shape = isMark.shape
+    length = shape[-1]
+
+    #marks before each index, so that marks in [i, j) are before[j] - before[i]
+    before = np.zeros(shape[:-1] + (length + 1,), dtype=np.int16)
+    np.cumsum(isMark, axis=-1, out=before[..., 1:])
+
+    stops = np.where((lines != 0) & ~isMark, np.arange(length), length)
+    stops = np.minimum.accumulate(stops[..., ::-1], axis=-1)[..., ::-1]
+    nextStop = np.concatenate([stops[..., 1:], np.full(shape[:-1] + (1,), length)], axis=-1)
+
+    return np.take_along_axis(before, nextStop, axis=-1) - before[..., 1:]
+
+def moveValues(cells, number):
+    """Value of every cell as ShallowAiPlayer.evaluateMove would give it, or -1
+    for occupied cells. cells can hold a stack of boards in its leading axes."""
+    size = cells.shape[-1]
+    lineCells, boardCells = lineIndices(size)
+
+    lines = np.full(cells.shape[:-2] + (4, 2 * size - 1, size), WALL, dtype=cells.dtype)
+    lines[(...,) + lineCells] = cells[(..., None) + boardCells]
+
+    #counts for my marks and the opponent's marks along the first axis
+    marks = np.array([number, 2 if number == 1 else 1]).reshape((2,) + (1,) * lines.ndim)
+    wall = np.full(lines.shape[:-1] + (1,), WALL, dtype=lines.dtype)
+    nextCells = np.concatenate([lines[..., 1:], wall], axis=-1)
+    prevCells = np.concatenate([wall, lines[..., :-1]], axis=-1)
+
+    forward = marksAhead(lines, marks)
+    backward = marksAhead(lines[..., ::-1], marks)[..., ::-1]
+    forwardTight = np.where(nextCells == marks, forward, 0)
+    backwardTight = np.where(prevCells == marks, backward, 0)
+
+    toBoard = lambda a: a[(...,) + lineCells]
+    myMarks = toBoard(forward[0] + backward[0])
+    myMarksTight = toBoard(np.maximum(forwardTight[0], backwardTight[0]))
+    oppMarks = toBoard(np.maximum(forwardTight[1], backwardTight[1]))
+
+    values = (np.where(oppMarks >= 2, oppMarks * 10, 0) + np.where(myMarksTight >= 2, myMarks * 10, 0)
+        + myMarks + oppMarks).sum(axis=-3, dtype=np.int32)
+
+    return np.where(cells == 0, values, -1)
+
+def bestMoves(values):
+    """Return (x, y) of the best value of each board, preferring smaller x and then y"""
+    size = values.shape[-1]
+    flat = np.swapaxes(values, -1, -2).reshape(values.shape[:-2] + (size * size,))
+    return [divmod(int(i), size) for i in np.atleast_1d(np.argmax(flat, axis=-1))]
+
+def nearRegion(cells, margin):
+    """Return the slices of the rows and columns of a square within the
+    margin of the marks, or of the centre cell if there are none"""
+    size = len(cells)
+    marked = cells != 0
+    ys = np.flatnonzero(marked.any(axis=1)).tolist()
+    xs = np.flatnonzero(marked.any(axis=0)).tolist()
+    if not ys:
+        mid = size // 2
+        return slice(mid, mid + 1), slice(mid, mid + 1)
+
+    top, bottom = max(0, ys[0] - margin), min(size, ys[-1] + margin + 1)
+    left, right = max(0, xs[0] - margin), min(size, xs[-1] + margin + 1)
+
+    #moveValues scores square boards, the shorter side is grown to match
+    side = max(bottom - top, right - left)
+    top = min(top, size - side)
+    left = min(left, size - side)
+    return slice(top, top + side), slice(left, left + side)
+
 class ShallowAiPlayer(FiveInRowPlayer):
     def evaluateBoard(self):
-        """Evaluate all moves on board and return the best one"""
-        moves = {}
-
-        for x in range(0, self.game.size):
-            for y in range(0, self.game.size):
-                if self.game.board[y][x] != 0:
-                    continue
-
-                value = self.evaluateMove((x,y))
-                moves[(x,y)] = value
-
-        return max(moves, key=moves.get)
+        """Evaluate the moves within the win length of the marks on the board
+        and return the best one, so that the cost depends on the marks only.
+
+        The moves get the values they have on the whole board, as no marks
+        are left out, but moves further away are not considered. On an empty
+        board the centre is played, and of equal moves the one with the
+        smallest x and then y within nearRegion is played, not the one of
+        the whole board."""
+        cells = self.game.board.cells
+        rows, columns = nearRegion(cells, self.game.winLength)
+        x, y = bestMoves(moveValues(cells[rows, columns], self.number))[0]
+        return x + columns.start, y + rows.start
 
     def countMarksInDirection(self, pos, d, mark, tight=False):
+        board = self.game.board
         x, y = pos[0], pos[1]
         count = 0
 
@@ -106,16 +203,17 @@ class ShallowAiPlayer(FiveInRowPlayer):
             x += d[0]
             y += d[1]
 
-            if not self.game.onBoard(x,y):
+            if not board.onBoard(x,y):
                 break
 
-            if self.game.getBoardPos(x,y) == mark:
+            cell = board.get(x,y)
+            if cell == mark:
                 count += 1
 
             elif tight and count == 0:
                 break
 
-            elif self.game.getBoardPos(x,y) != 0:
+            elif cell != 0:
                 break #these are not the marks you are looking for
 
         return count
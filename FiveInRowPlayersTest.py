@@ -0,0 +1,86 @@
+import random
+import unittest
+import numpy as np
+from Board import Board
+from FiveInRow import FiveInRow
+from FiveInRowPlayers import RandomPlayer, ShallowAiPlayer, moveValues, bestMoves, nearRegion
+
+class FiveInRowPlayersTest(unittest.TestCase):
+
+    def randomGame(self, rng, size):
+        player = ShallowAiPlayer()
+        game = FiveInRow(player, RandomPlayer())
+        game.size = size
+        game.board = Board(size)
+        for _ in range(rng.randint(0, size * size - 1)):
+            game.board.set(rng.randrange(size), rng.randrange(size), rng.randint(1, 2))
+        return player, game
+
+    def test_moveValues(self):
+        rng = random.Random(0)
+
+        for size in [5, 9, 15]:
+            for _ in range(20):
+                player, game = self.randomGame(rng, size)
+
+                for number in [1, 2]:
+                    player.setNumber(number)
+                    values = moveValues(game.board.cells, number)
+
+                    moves = {}
+                    for x, y in game.board.emptyCells():
+                        moves[(x, y)] = player.evaluateMove((x, y))
+                        self.assertEqual(values[y, x], moves[(x, y)])
+
+                    #the player plays the first best move near the marks, which is
+                    #the first best move of the whole board when that one is near
+                    rows, columns = nearRegion(game.board.cells, game.winLength)
+                    near = {(x, y): value for (x, y), value in moves.items()
+                        if rows.start <= y < rows.stop and columns.start <= x < columns.stop}
+                    move = player.requestMove()
+                    self.assertEqual(move, max(near, key=near.get))
+                    best = bestMoves(values)[0]
+                    if best in near:
+                        self.assertEqual(move, best)
+
+    def test_batch(self):
+        rng = random.Random(1)
+        games = [self.randomGame(rng, 15) for _ in range(5)]
+
+        cells = np.stack([game.board.cells for _, game in games])
+        moves = [bestMoves(moveValues(game.board.cells, 1))[0] for _, game in games]
+        self.assertEqual(bestMoves(moveValues(cells, 1)), moves)
+
+    def test_nearRegion(self):
+        player = ShallowAiPlayer()
+        game = FiveInRow(player, RandomPlayer(), size=60)
+        self.assertEqual(player.requestMove(), (30, 30))
+
+        for x, y, mark in [(30, 30, 1), (31, 31, 2), (29, 32, 1)]:
+            game.setBoardPos(x, y, mark)
+        cells = game.board.cells
+        rows, columns = nearRegion(cells, game.winLength)
+        self.assertEqual((rows, columns), (slice(25, 38), slice(24, 37)))
+
+        #marks are never cut off, so the values match those of the whole board
+        self.assertTrue(np.array_equal(moveValues(cells[rows, columns], 1), moveValues(cells, 1)[rows, columns]))
+        x, y = player.requestMove()
+        self.assertTrue(rows.start <= y < rows.stop and columns.start <= x < columns.stop)
+
+    def test_nearRegionTieBreak(self):
+        player = ShallowAiPlayer()
+        game = FiveInRow(player, RandomPlayer(), size=30)
+
+        #the whole board would give the first of the equal moves, the corner
+        self.assertEqual(bestMoves(moveValues(game.board.cells, 1))[0], (0, 0))
+        self.assertEqual(player.requestMove(), (15, 15))
+
+        #(0, 0) is on the diagonal of the mark and worth as much as (15, 15)
+        game.setBoardPos(20, 20, 1)
+        values = moveValues(game.board.cells, 1)
+        self.assertEqual(bestMoves(values)[0], (0, 0))
+        self.assertEqual(values[15, 15], values[0, 0])
+        self.assertEqual(player.requestMove(), (15, 15))
+
+if __name__ == '__main__':
+    unittest.main()
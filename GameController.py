@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+class GameController:
+    """Plays any number of games concurrently on one asyncio event loop.
+
+    A game only holds the loop while it checks a move. Players waiting for
+    input, like QtPlayer, wait on a future that the input completes, and
+    engines think in the executor, the default thread pool of the loop if it
+    is None. Hosts that run their own loop in the main thread, like a GUI,
+    can run the controller's loop in a background thread with startThread()."""
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.tasks = set()
+        self.loop = None
+        self.thread = None
+
+    def start(self, game):
+        """Start playing the game on the running loop, returns its task"""
+        task = asyncio.ensure_future(game.playAsync(self.executor))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def play(self, games):
+        """Play the games to the end and return their winners"""
+        return await asyncio.gather(*[self.start(game) for game in games])
+
+    def startThread(self):
+        """Run a loop for the games in a background thread"""
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def submit(self, game):
+        """Start the game on the background loop from any thread, returns a
+        concurrent.futures.Future of the winner"""
+        async def startGame():
+            return await self.start(game)
+        return asyncio.run_coroutine_threadsafe(startGame(), self.loop)
+
+    def stopThread(self):
+        """Cancel the games on the background loop and stop it"""
+        def stop():
+            for task in list(self.tasks):
+                task.cancel()
+            self.loop.stop()
+        self.loop.call_soon_threadsafe(stop)
+        self.thread.join()
+        self.loop.close()
+        self.loop = self.thread = None
@@ -0,0 +1,63 @@
+import asyncio
+import random
+import threading
+import unittest
+from FiveInRow import FiveInRow
+from FiveInRowPlayers import FiveInRowPlayer, RandomPlayer
+from GameController import GameController
+
+class ClickingPlayer(FiveInRowPlayer):
+    """Plays its moves like a gui player, completing a future from the loop"""
+
+    def __init__(self, moves):
+        super().__init__()
+        self.moves = list(moves)
+
+    def requestMove(self):
+        raise AssertionError("the move should be requested on the loop")
+
+    async def requestMoveAsync(self, executor=None):
+        future = asyncio.get_running_loop().create_future()
+        asyncio.get_running_loop().call_later(0.001, future.set_result, self.moves.pop(0))
+        return await future
+
+class GameControllerTest(unittest.TestCase):
+
+    def test_play(self):
+        random.seed(3)
+        games = [FiveInRow(RandomPlayer(), RandomPlayer()) for _ in range(100)]
+        threads = threading.active_count()
+
+        async def play():
+            winners = await GameController().play(games)
+            #engines share the thread pool of the loop instead of a thread each
+            self.assertLess(threading.active_count() - threads, 50)
+            return winners
+
+        winners = asyncio.run(play())
+        self.assertEqual(winners, [game.winner for game in games])
+        for game in games:
+            self.assertIn(game.winner, (0, 1, 2))
+            self.assertEqual(len(game.moves), game.turn)
+            self.assertEqual(len(set(game.moves)), len(game.moves))
+
+    def test_clickingPlayers(self):
+        p1 = ClickingPlayer([(x, 0) for x in range(5)])
+        p2 = ClickingPlayer([(x, 1) for x in range(4)])
+        game = FiveInRow(p1, p2)
+
+        self.assertEqual(asyncio.run(GameController().play([game])), [1])
+        self.assertEqual(game.turn, 9)
+
+    def test_submit(self):
+        controller = GameController()
+        controller.startThread()
+        try:
+            random.seed(4)
+            future = controller.submit(FiveInRow(RandomPlayer(), RandomPlayer()))
+            self.assertIn(future.result(timeout=10), (0, 1, 2))
+        finally:
+            controller.stopThread()
+
+if __name__ == '__main__':
+    unittest.main()
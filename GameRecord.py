@@ -0,0 +1,145 @@
+import argparse
+import struct
+import sys
+from collections import namedtuple
+from Board import Board
+
+#an archive is a magic and the records of the games one after another:
+#size, win length, winner, flags, opening moves, moves, name lengths
+#the names of players 1 and 2 as utf-8
+#the moves, one byte x << 4 | y on boards up to 16x16, otherwise two bytes x, y
+#the times of the moves after the opening as half floats, if flagged
+MAGIC = b"FIRGAME1"
+GAME = struct.Struct("<BBBBHHBB")
+TIMES = 1
+
+#the winner of a game that was not played to the end
+UNFINISHED = 255
+
+GameRecord = namedtuple("GameRecord", "size winLength winner players opening moves moveTimes")
+
+def playerName(player):
+    return getattr(player, "name", None) or type(player).__name__
+
+def encodeMoves(moves, size):
+    if size <= 16:
+        return bytes(x << 4 | y for x, y in moves)
+    return bytes(c for move in moves for c in move)
+
+def decodeMoves(data, size):
+    if size <= 16:
+        return [(b >> 4, b & 0xf) for b in data]
+    return list(zip(data[::2], data[1::2]))
+
+def encodeGame(game, names=None, times=True):
+    """Return the record of a FiveInRow game as bytes. The names of players
+    1 and 2 default to their name attribute or class."""
+    if names is None:
+        players = sorted(game.players, key=lambda player: player.number)
+        names = [playerName(player) for player in players]
+    names = [name.encode("utf-8")[:255] for name in names]
+
+    opening = len(game.moves) - len(game.moveTimes)
+    winner = UNFINISHED if game.winner is None else game.winner
+    header = GAME.pack(game.size, game.winLength, winner, TIMES if times else 0,
+        opening, len(game.moves), len(names[0]), len(names[1]))
+
+    data = header + names[0] + names[1] + encodeMoves(game.moves, game.size)
+    if times:
+        #half floats keep about three digits, plenty for move times
+        data += struct.pack("<%de" % len(game.moveTimes), *(min(t, 65504.0) for t in game.moveTimes))
+    return data
+
+class GameWriter:
+    """Appends game records to an archive file.
+
+    Set it as the recorder of a FiveInRow game and the game is written
+    when it ends, so an archive grows one game at a time however many
+    games are played."""
+
+    def __init__(self, path, names=None, times=True):
+        self.names = names
+        self.times = times
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.count = 0
+
+    def write(self, game):
+        self.writeEncoded(encodeGame(game, self.names, self.times))
+
+    def writeEncoded(self, data):
+        self.file.write(data)
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def isArchive(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def readGames(path):
+    """Yield the GameRecords of an archive one by one, reading the file as
+    they are consumed"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a game archive" % path)
+
+        while True:
+            header = f.read(GAME.size)
+            if not header:
+                return
+            if len(header) < GAME.size:
+                raise ValueError("%s ends in the middle of a game" % path)
+            size, winLength, winner, flags, opening, count, name1, name2 = GAME.unpack(header)
+
+            moveBytes = count * (1 if size <= 16 else 2)
+            timeCount = count - opening if flags & TIMES else 0
+            length = name1 + name2 + moveBytes + 2 * timeCount
+            data = f.read(length)
+            if len(data) < length:
+                raise ValueError("%s ends in the middle of a game" % path)
+
+            names = (data[:name1].decode("utf-8"), data[name1:name1 + name2].decode("utf-8"))
+            moves = decodeMoves(data[name1 + name2:name1 + name2 + moveBytes], size)
+            moveTimes = list(struct.unpack_from("<%de" % timeCount, data, name1 + name2 + moveBytes))
+            yield GameRecord(size, winLength, None if winner == UNFINISHED else winner,
+                names, opening, moves, moveTimes)
+
+def replayPositions(games, plies=None):
+    """Replay the games and yield (board, player to move, move played) before
+    each of the first plies moves of every game. The board is reused and
+    changes as the replay goes on, copy it to keep a position."""
+    for game in games:
+        board = Board(game.size)
+        for ply, move in enumerate(game.moves[:plies]):
+            player = 1 + ply % 2
+            yield board, player, move
+            board.set(*move, player)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize game archives")
+    parser.add_argument("archives", nargs="+")
+    args = parser.parse_args(argv)
+
+    games, moves, wins = 0, 0, {}
+    for path in args.archives:
+        for game in readGames(path):
+            games += 1
+            moves += len(game.moves)
+            wins[game.winner] = wins.get(game.winner, 0) + 1
+
+    print("%d games, %d moves" % (games, moves))
+    print("player 1: %d  player 2: %d  draws: %d  unfinished: %d" %
+        (wins.get(1, 0), wins.get(2, 0), wins.get(0, 0), wins.get(None, 0)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import os
+import random
+import tempfile
+import unittest
+from Board import MAX_SIZE
+from FiveInRow import FiveInRow
+from FiveInRowPlayers import RandomPlayer
+from GameRecord import GameWriter, isArchive, readGames, replayPositions
+from OpeningBook import readGameLines
+
+class GameRecordTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".games")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def playGames(self, count, size=15, opening=()):
+        games = []
+        with GameWriter(self.path) as writer:
+            for i in range(count):
+                random.seed(i)
+                game = FiveInRow(RandomPlayer(), RandomPlayer(), size, recorder=writer)
+                game.playOpening(opening)
+                game.play()
+                games.append(game)
+        return games
+
+    def test_roundTrip(self):
+        for size in (15, 16, 19):
+            games = self.playGames(3, size, [(0, 0), (size - 1, size - 1)])
+            records = list(readGames(self.path))
+            self.assertEqual(len(records), 3)
+            for game, record in zip(games, records):
+                self.assertEqual(record.size, size)
+                self.assertEqual(record.winner, game.winner)
+                self.assertEqual(record.players, ("RandomPlayer", "RandomPlayer"))
+                self.assertEqual(record.opening, 2)
+                self.assertEqual(record.moves, game.moves)
+                self.assertEqual(len(record.moveTimes), len(game.moveTimes))
+                for t, recorded in zip(game.moveTimes, record.moveTimes):
+                    self.assertAlmostEqual(t, recorded, delta=t / 500 + 1e-7)
+            os.truncate(self.path, 0)
+
+    def test_largestSize(self):
+        game = FiveInRow(RandomPlayer(), RandomPlayer(), MAX_SIZE, recorder=GameWriter(self.path))
+        opening = [(MAX_SIZE - 1, MAX_SIZE - 1), (0, MAX_SIZE - 1), (MAX_SIZE - 1, 0)]
+        game.playOpening(opening)
+        game.endGame(None)
+        game.recorder.close()
+
+        record, = readGames(self.path)
+        self.assertEqual(record.size, MAX_SIZE)
+        self.assertEqual(record.moves, opening)
+
+    def test_compact(self):
+        games = self.playGames(5)
+        moves = sum(len(game.moves) for game in games)
+        self.assertTrue(isArchive(self.path))
+        self.assertLess(os.path.getsize(self.path), 8 + 5 * 40 + 3 * moves)
+
+    def test_appendAndTruncate(self):
+        self.playGames(2)
+        self.playGames(2)
+        self.assertEqual(len(list(readGames(self.path))), 4)
+
+        with open(self.path, "rb+") as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        with self.assertRaises(ValueError):
+            list(readGames(self.path))
+
+    def test_replayPositions(self):
+        games = self.playGames(3)
+        positions = replayPositions(readGames(self.path), 10)
+        for game in games:
+            for ply in range(10):
+                board, player, move = next(positions)
+                self.assertEqual(board.count(), ply)
+                self.assertEqual(player, 1 + ply % 2)
+                self.assertEqual(move, game.moves[ply])
+                self.assertEqual(board.get(*move), 0)
+        self.assertIsNone(next(positions, None))
+
+        self.assertEqual(readGameLines(self.path), [game.moves for game in games])
+
+if __name__ == '__main__':
+    unittest.main()
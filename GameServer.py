@@ -0,0 +1,334 @@
+import argparse
+import asyncio
+import inspect
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from Board import Board, checkSize
+from FiveInRowPlayers import moveValues, bestMoves, nearRegion
+from MinimaxPlayer import MinimaxStatus
+from Patterns import WIN_LENGTH, checkWinLength
+from SelfPlay import parsePlayer
+
+#requests and responses are JSON objects, one per line:
+#{"id": 1, "engine": "minimax:depth=4", "moves": [[7, 7], [8, 8]], "timeLimit": 0.5}
+#where "size" and "winLength" can be given for other than 15x15 five in a row
+#{"id": 1, "move": [6, 6], "elapsed": 0.41}
+#{"id": 2, "metrics": true} is answered with {"id": 2, "metrics": {...}}
+HOST = "127.0.0.1"
+PORT = 7878
+TIME_LIMIT = 1.0
+MAX_BATCH = 64
+LATENCY_WINDOW = 1000
+
+def shallowMoves(boards, players, winLength=WIN_LENGTH):
+    """Return the ShallowAiPlayer moves of boards of the same size, scored at
+    once. The marks are swapped where player 2 is to move, so that all boards
+    are scored for player 1, and only the region covering the moves each
+    player would consider is scored."""
+    cells = np.stack([board.cells for board in boards])
+    swap = (np.array(players) == 2).reshape(-1, 1, 1) & (cells != 0)
+    cells = np.where(swap, 3 - cells, cells)
+
+    regions = [nearRegion(board, winLength) for board in cells]
+    top = min(rows.start for rows, _ in regions)
+    left = min(columns.start for _, columns in regions)
+    bottom = max(rows.stop for rows, _ in regions)
+    right = max(columns.stop for _, columns in regions)
+
+    #like nearRegion, the union is grown to a square for moveValues
+    size = cells.shape[-1]
+    side = max(bottom - top, right - left)
+    top = min(top, size - side)
+    left = min(left, size - side)
+    values = moveValues(cells[:, top:top + side, left:left + side], 1)
+
+    #moves outside the region of the board itself count as occupied
+    near = np.zeros(values.shape, dtype=bool)
+    for i, (boardRows, boardColumns) in enumerate(regions):
+        near[i, boardRows.start - top:boardRows.stop - top, boardColumns.start - left:boardColumns.stop - left] = True
+    values = np.where(near, values, -1)
+    return [(x + left, y + top) for x, y in bestMoves(values)]
+
+def searchMove(player, board, number, timeLimit, winLength):
+    player.setNumber(number)
+    player.timeLimit = timeLimit
+    #the status counts the turns of the marks it is built from
+    player.gameStatus = MinimaxStatus(board, 0, player.radius, winLength)
+    return player.search()[1]
+
+class MoveRequest:
+    def __init__(self, engine, board, player, winLength, timeLimit):
+        self.engine = engine
+        self.board = board
+        self.player = player
+        self.winLength = winLength
+        self.received = time.monotonic()
+        self.deadline = self.received + timeLimit
+        self.future = asyncio.get_running_loop().create_future()
+
+class GameServer:
+    """Answers move requests of many games from one process.
+
+    ShallowAiPlayer requests are queued and scored in batches: all requests
+    that arrive while a batch is scored go into the next one, up to
+    maxBatch. Minimax requests are queued for a number of searchers, each
+    keeping one MinimaxPlayer per engine spec so its transposition table
+    carries over between requests. A search gets the time left of the
+    request's time budget, counted from when it was received."""
+
+    def __init__(self, timeLimit=TIME_LIMIT, maxBatch=MAX_BATCH, searchers=1):
+        self.timeLimit = timeLimit
+        self.maxBatch = maxBatch
+        self.searchers = searchers
+        self.executor = None
+        self.batchQueue = None
+        self.searchQueue = None
+        self.players = {}
+        self.tasks = []
+
+        self.served = 0
+        self.errors = 0
+        self.batches = 0
+        self.batchedRequests = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self):
+        self.executor = ThreadPoolExecutor(self.searchers + 1)
+        self.batchQueue = asyncio.Queue()
+        self.searchQueue = asyncio.Queue()
+        self.tasks = [asyncio.ensure_future(self.batchLoop())]
+        self.tasks += [asyncio.ensure_future(self.searchLoop(i)) for i in range(self.searchers)]
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+        self.tasks = []
+
+    async def requestMove(self, engine, moves, size=15, timeLimit=None, winLength=WIN_LENGTH):
+        """Return the move of the engine after the moves, made by the
+        players in turn. Raises ValueError for a bad request."""
+        checkSize(size)
+        checkWinLength(winLength)
+        name = engine.partition(":")[0]
+        if name not in ("shallow", "minimax"):
+            raise ValueError("Unknown engine %r, expected shallow or minimax" % engine)
+        if name == "minimax":
+            cls, kwargs = parsePlayer(engine)
+            try:
+                inspect.signature(cls).bind(**kwargs)
+            except TypeError as e:
+                raise ValueError("Bad options in %r: %s" % (engine, e))
+
+        board = Board(size)
+        for move in moves:
+            x, y = move
+            if not board.onBoard(x, y) or board.get(x, y) != 0:
+                raise ValueError("Illegal move %s" % (move,))
+            board.set(x, y, 1 + board.count() % 2)
+        if board.count() == size * size:
+            raise ValueError("The board is full")
+
+        request = MoveRequest(engine, board, 1 + len(moves) % 2, winLength,
+            self.timeLimit if timeLimit is None else timeLimit)
+        queue = self.batchQueue if name == "shallow" else self.searchQueue
+        queue.put_nowait(request)
+        return await request.future
+
+    def finish(self, request, move=None, error=None):
+        if request.future.done():
+            return
+        self.latencies.append(time.monotonic() - request.received)
+        if error is None:
+            self.served += 1
+            request.future.set_result(move)
+        else:
+            self.errors += 1
+            request.future.set_exception(error)
+
+    async def batchLoop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = [await self.batchQueue.get()]
+            while len(requests) < self.maxBatch and not self.batchQueue.empty():
+                requests.append(self.batchQueue.get_nowait())
+            self.batches += 1
+            self.batchedRequests += len(requests)
+
+            groups = {}
+            for request in requests:
+                groups.setdefault((request.board.size, request.winLength), []).append(request)
+            for (_, winLength), group in groups.items():
+                try:
+                    moves = await loop.run_in_executor(self.executor, shallowMoves,
+                        [request.board for request in group], [request.player for request in group], winLength)
+                except Exception as e:
+                    for request in group:
+                        self.finish(request, error=e)
+                    continue
+                for request, move in zip(group, moves):
+                    self.finish(request, move)
+
+    async def searchLoop(self, searcher):
+        loop = asyncio.get_running_loop()
+        while True:
+            request = await self.searchQueue.get()
+            try:
+                player = self.players.get((searcher, request.engine))
+                if player is None:
+                    cls, kwargs = parsePlayer(request.engine)
+                    kwargs.setdefault("timeLimit", self.timeLimit)
+                    player = self.players[searcher, request.engine] = cls(**kwargs)
+
+                #the first iteration of the search always completes
+                timeLimit = max(request.deadline - time.monotonic(), 0.001)
+                move = await loop.run_in_executor(self.executor, searchMove,
+                    player, request.board, request.player, timeLimit, request.winLength)
+            except Exception as e:
+                self.finish(request, error=e)
+                continue
+            self.finish(request, move)
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+        return {
+            "queueDepth": {
+                "shallow": self.batchQueue.qsize() if self.batchQueue else 0,
+                "minimax": self.searchQueue.qsize() if self.searchQueue else 0,
+            },
+            "served": self.served,
+            "errors": self.errors,
+            "batches": self.batches,
+            "meanBatchSize": self.batchedRequests / self.batches if self.batches else 0.0,
+            "latency": {
+                "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": latencies[-1] if latencies else 0.0,
+            },
+        }
+
+    async def respond(self, line, writer):
+        response = {}
+        try:
+            request = json.loads(line)
+            if "id" in request:
+                response["id"] = request["id"]
+            if request.get("metrics"):
+                response["metrics"] = self.metrics()
+            else:
+                start = time.monotonic()
+                move = await self.requestMove(request.get("engine", "shallow"), request.get("moves", []),
+                    request.get("size", 15), request.get("timeLimit"), request.get("winLength", WIN_LENGTH))
+                response["move"] = list(move)
+                response["elapsed"] = time.monotonic() - start
+        except (ValueError, TypeError, AttributeError) as e:
+            response["error"] = str(e)
+
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        """Answer the requests of one connection, several can be in progress at once"""
+        pending = set()
+        try:
+            async for line in reader:
+                if line.strip():
+                    task = asyncio.ensure_future(self.respond(line, writer))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, path=None):
+        """Start listening on the TCP port, or on the Unix socket path if it
+        is given, and return the asyncio server"""
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+class GameClient:
+    """A client of a GameServer, requests can be sent concurrently"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.nextId = 0
+        self.readTask = asyncio.ensure_future(self.readResponses())
+
+    @classmethod
+    async def connect(cls, host=HOST, port=PORT, path=None):
+        if path is not None:
+            return cls(*await asyncio.open_unix_connection(path))
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def readResponses(self):
+        async for line in self.reader:
+            response = json.loads(line)
+            future = self.pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+
+    async def request(self, **fields):
+        self.nextId += 1
+        fields["id"] = self.nextId
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.nextId] = future
+        self.writer.write((json.dumps(fields) + "\n").encode())
+        await self.writer.drain()
+        return await future
+
+    async def requestMove(self, moves, engine="shallow", timeLimit=None, size=15, winLength=WIN_LENGTH):
+        fields = {"engine": engine, "moves": [list(move) for move in moves], "size": size, "winLength": winLength}
+        if timeLimit is not None:
+            fields["timeLimit"] = timeLimit
+        response = await self.request(**fields)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return tuple(response["move"])
+
+    async def metrics(self):
+        return (await self.request(metrics=True))["metrics"]
+
+    async def close(self):
+        self.readTask.cancel()
+        self.writer.close()
+        await self.writer.wait_closed()
+
+async def runServer(args):
+    server = GameServer(args.timeLimit, args.batch, args.searchers)
+    await server.start()
+    listener = await server.serve(args.host, args.port, args.unix)
+    print("serving on %s" % (args.unix or "%s:%d" % (args.host, args.port)))
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve engine moves to many games over a line protocol")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("-p", "--port", type=int, default=PORT)
+    parser.add_argument("-u", "--unix", help="listen on a Unix socket at this path instead")
+    parser.add_argument("-t", "--timeLimit", type=float, default=TIME_LIMIT, help="default time budget of a request")
+    parser.add_argument("-b", "--batch", type=int, default=MAX_BATCH, help="most shallow requests scored at once")
+    parser.add_argument("-s", "--searchers", type=int, default=1, help="minimax searches run at once")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(runServer(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
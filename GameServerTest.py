@@ -0,0 +1,112 @@
+import asyncio
+import random
+import unittest
+from Benchmark import randomPositions, gameAt
+from Board import Board
+from FiveInRowPlayers import ShallowAiPlayer
+from GameServer import GameServer, GameClient, MoveRequest, searchMove, shallowMoves
+from MinimaxPlayer import MinimaxPlayer
+
+def randomLine(rng, stones, size=15):
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    return rng.sample(cells, stones)
+
+class GameServerTest(unittest.TestCase):
+
+    def test_shallowMoves(self):
+        boards = randomPositions(10, 30, seed=2)
+        players = [1 + i % 2 for i in range(len(boards))]
+
+        expected = []
+        for board, number in zip(boards, players):
+            player = ShallowAiPlayer()
+            gameAt(board, *([player, None] if number == 1 else [None, player]))
+            expected.append(player.requestMove())
+        self.assertEqual(shallowMoves(boards, players), expected)
+
+    def test_shallowMovesApart(self):
+        #boards whose marks are in different parts of the board are scored together
+        boards = []
+        for stones in [[(1, 1)], [(1, 13)], [(13, 2), (12, 3)], [], [(7, 7), (8, 8), (14, 14)]]:
+            board = Board(15)
+            for i, (x, y) in enumerate(stones):
+                board.set(x, y, 1 + i % 2)
+            boards.append(board)
+        players = [1 + board.count() % 2 for board in boards]
+
+        expected = []
+        for board, number in zip(boards, players):
+            player = ShallowAiPlayer()
+            gameAt(board, *([player, None] if number == 1 else [None, player]))
+            expected.append(player.requestMove())
+        self.assertEqual(shallowMoves(boards, players), expected)
+        self.assertEqual(shallowMoves(boards[:2], players[:2]), expected[:2])
+        self.assertEqual(shallowMoves(boards[1:3], players[1:3]), expected[1:3])
+
+    def test_searchMoveFullBoard(self):
+        board = randomPositions(1, 120, seed=4)[0]
+        player = MinimaxPlayer(timeLimit=0.05)
+        x, y = searchMove(player, board, 1, 0.05, 5)
+        self.assertEqual(board.get(x, y), 0)
+        self.assertEqual(player.gameStatus.turnNo, 120)
+
+    def test_searchLoopError(self):
+        #a player that cannot be built fails its request, not the searcher
+        async def run():
+            server = GameServer(timeLimit=0.1)
+            await server.start()
+            try:
+                bad = MoveRequest("minimax:foo=1", Board(15), 1, 5, 0.1)
+                server.searchQueue.put_nowait(bad)
+                await asyncio.wait([bad.future], timeout=5)
+                self.assertIsInstance(bad.future.exception(), TypeError)
+
+                good = MoveRequest("minimax:depth=2", Board(15), 1, 5, 0.1)
+                server.searchQueue.put_nowait(good)
+                return await asyncio.wait_for(good.future, 5)
+            finally:
+                await server.close()
+
+        self.assertEqual(asyncio.run(run()), (7, 7))
+
+    def test_server(self):
+        rng = random.Random(1)
+        lines = [randomLine(rng, rng.randint(0, 40)) for _ in range(50)]
+
+        async def run():
+            server = GameServer(timeLimit=0.2)
+            await server.start()
+            listener = await server.serve(port=0)
+            client = await GameClient.connect(port=listener.sockets[0].getsockname()[1])
+            try:
+                moves = await asyncio.gather(*[client.requestMove(line) for line in lines])
+                with self.assertRaises(ValueError):
+                    await client.requestMove([], "minimax:foo=1")
+                with self.assertRaises(ValueError):
+                    await client.requestMove([], "minimax:depth=0.5.5")
+                searched = await client.requestMove(lines[0], "minimax:depth=2", timeLimit=0.1)
+                with self.assertRaises(ValueError):
+                    await client.requestMove([(7, 7), (7, 7)])
+                with self.assertRaises(ValueError):
+                    await client.requestMove([], "alphazero")
+                with self.assertRaises(ValueError):
+                    await client.requestMove([], "minimax:depth=1", size=256)
+                return moves, searched, await client.metrics()
+            finally:
+                await client.close()
+                listener.close()
+                await server.close()
+
+        moves, searched, metrics = asyncio.run(run())
+        for line, move in zip(lines + lines[:1], moves + [searched]):
+            self.assertNotIn(move, line)
+            self.assertTrue(0 <= min(move) and max(move) < 15)
+
+        self.assertEqual(metrics["served"], 51)
+        self.assertEqual(metrics["errors"], 0)
+        self.assertEqual(metrics["queueDepth"], {"shallow": 0, "minimax": 0})
+        self.assertLess(metrics["batches"], 50)
+        self.assertGreater(metrics["latency"]["max"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,272 +1,900 @@
-import copy
-from collections import OrderedDict, deque
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from Board import Board, checkSize, boardLines, boardLineCells, emptyLineCode, lineCode, codeString
+from Bitboard import Bitboard
+from CandidateMoves import CandidateMoves
 from FiveInRowPlayers import FiveInRowPlayer
+from SearchStats import SearchStats
+from Symmetry import SYMMETRIES, INVERSE, symmetricZobrist, transform
+from ThreatSearch import ThreatSearch
+from OpeningBook import OpeningBook
+from Patterns import P1, P2, FIVES, OPEN_FOURS, FOURS, OPEN_THREES, OPEN_TWOS, NO_PATTERNS
+from Patterns import WIN_LENGTH, WIN, BLOCK_WIN, playerPattern, winPatterns, winThreats
+from TranspositionTable import TranspositionTable, TABLE_MEMORY, EXACT, LOWER, UPPER
+from Zobrist import HASH_BITS, HASH_MASK
+
+log = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def countedPatterns(winLength=WIN_LENGTH):
+    """The patterns of both players in the order of the pattern counts"""
+    return tuple(tuple(playerPattern(p, player) for p in patterns)
+        for player in (1, 2) for _, patterns in winPatterns(winLength))
+
+#pattern counts and threat scores of all cells of recently seen lines by
+#line code, each by win length
+lineCounts = {}
+lineThreats = {}
+LINE_CACHE_SIZE = 2**18
+
+#history scores are capped to fit below the killer flag in move sort keys
+HISTORY_BITS = 24
+HISTORY_MAX = (1 << HISTORY_BITS) - 1
+
+def windowWeights(before, after, winLength=WIN_LENGTH):
+    """Return the (make, block) weights of the strongest threat of a player 1
+    mark between before and after, marks of player 1 and empty cells"""
+    window = before + "1" + after
+    if "11" not in window:
+        return 0, 0
+
+    #only occurrences covering the cell count
+    k = len(before)
+    for threat, make, block in winThreats(winLength):
+        if any(window.find(p, max(0, k - len(p) + 1), k + len(p)) >= 0 for p in threat):
+            return make, block
+    return 0, 0
+
+class ThreatTable(dict):
+    """Threat weights of a mark by the cells on either side of it, as seen
+    by the player of the mark.
+
+    No threat pattern has opponent marks in it, so the opponent's marks and
+    the board edge both end the cells that matter. A side is the string of
+    own marks and empty cells up to the nearest such blocker, at most a win
+    length long, which leaves few enough keys to compute them all."""
+
+    def __init__(self, winLength):
+        super().__init__()
+        self.winLength = winLength
+
+    def fill(self):
+        sides = [""]
+        for length in range(self.winLength):
+            sides += [side + c for side in sides if len(side) == length for c in "01"]
+        for before in sides:
+            for after in sides:
+                self[before, after] = windowWeights(before, after, self.winLength)
+        return self
+
+    def __missing__(self, key):
+        weights = self[key] = windowWeights(*key, self.winLength)
+        return weights
+
+@lru_cache(maxsize=None)
+def threatTable(winLength=WIN_LENGTH):
+    #the table grows fourfold with each longer win, those are filled as used
+    table = ThreatTable(winLength)
+    return table.fill() if winLength == WIN_LENGTH else table
+
+threatTable(WIN_LENGTH)
+
+#a line as seen by each player, own marks 1, empty cells 0 and blockers x
+PLAYER_VIEWS = (None, str.maketrans("2", "x"), str.maketrans("12", "x1"))
+
+def evaluateLineThreats(line, winLength=WIN_LENGTH):
+    """Return the threat scores of each cell of the line as (None, scores of
+    player 1, scores of player 2). A score adds the weights of the threats the
+    player makes with a mark on the cell and of the opponent's threats it blocks."""
+    table = threatTable(winLength)
+    views = [line.translate(PLAYER_VIEWS[player]) for player in (1, 2)]
+    scores = (None, [], [])
+    for offset in range(len(line)):
+        #the longest threat is one longer than a win
+        start = offset - winLength if offset > winLength else 0
+        weights = []
+        for view in views:
+            before = view[start:offset]
+            before = before[before.rfind("x") + 1:]
+            after = view[offset + 1:offset + winLength + 1]
+            end = after.find("x")
+            weights.append(table[before, after if end < 0 else after[:end]])
+        scores[1].append(weights[0][0] + weights[1][1])
+        scores[2].append(weights[1][0] + weights[0][1])
+    return None, tuple(scores[1]), tuple(scores[2])
+
+def evaluateLineCounts(line, winLength=WIN_LENGTH):
+    """Count the patterns of both players on a line, like str.count"""
+    #every pattern needs at least two marks of the same player next to each other
+    if "11" not in line and "22" not in line:
+        return NO_PATTERNS
+    return tuple(sum(map(line.count, patterns)) for patterns in countedPatterns(winLength))
+
+#bound of all scores, the window of a full search, and the half width of
+#the window around the previous iteration's score in iterative deepening
+INFINITY = 200000
+ASPIRATION_WINDOW = 16
+
+class SearchTimeout(Exception):
+    pass
+
+#search state of a root search worker process
+workerPlayer = None
+workerBest = None
+
+def initWorker(sharedBest, tableMemory, forcedResponses):
+    global workerPlayer, workerBest
+    workerPlayer = MinimaxPlayer(1, tableMemory, forcedResponses=forcedResponses)
+    workerBest = sharedBest
+
+def searchRootMove(status, depth, index, move, maximizing, deadline, age, collectStats):
+    """Search one root move in a worker process. Scores are from the point of
+    view of the player at the root, and the best one so far is shared with the
+    other workers as [score, move index]. Returns the nodes visited and the
+    search stats, or None if the search timed out."""
+    if deadline is not None and time.monotonic() > deadline:
+        return None
+
+    player = workerPlayer
+    player.transpTable.age = age
+    player.deadline = deadline
+    player.nodeNo = 0
+    player.newMove(status.size)
+    player.stats = SearchStats() if collectStats else None
+
+    with workerBest.get_lock():
+        best, bestIndex = workerBest[0], workerBest[1]
+
+    #moves before the current best one win ties, later ones have to beat it
+    alpha = best - 1 if index < bestIndex else best
+
+    status.update(*move, 1 if maximizing else 2)
+    try:
+        score = -player.negamax(status, depth-1, -INFINITY, -alpha, 2 if maximizing else 1)[0]
+    except SearchTimeout:
+        return None
+
+    with workerBest.get_lock():
+        if score > workerBest[0] or (score == workerBest[0] and index < workerBest[1]):
+            workerBest[0], workerBest[1] = score, index
+
+    if player.stats is not None:
+        player.stats.nodes = player.nodeNo
+    return player.nodeNo, player.stats
 
 class MinimaxPlayer(FiveInRowPlayer):
 
-    def __init__(self, depth):
+    def __init__(self, depth=None, tableMemory=TABLE_MEMORY, timeLimit=None, workers=None, onStats=None, radius=1,
+            forcedResponses=True, vcfNodes=2000, vctNodes=50, book=None, ponder=False):
         super().__init__()
+        if depth is None and timeLimit is None:
+            raise ValueError("MinimaxPlayer needs a search depth or a time limit")
+
         self.gameStatus = None
         self.searchDepth = depth
-        self.transpTable = dict()
-        self.transpTablePrev = dict()
+        self.radius = radius
+        self.timeLimit = timeLimit
+        self.deadline = None
+        self.completedDepth = 0
+        self.tableMemory = tableMemory
+        self.transpTable = TranspositionTable(tableMemory)
         self.nodeNo = 0
 
+        #move ordering: killer moves by ply and history scores by player and cell.
+        #With forcedResponses, only moves blocking a five are searched when the
+        #opponent threatens to make one and there is no five to make first.
+        self.forcedResponses = forcedResponses
+        self.killers = {}
+        self.historyScores = [None, [], []]
+
+        #node budgets of the forced win search done before minimax, 0 skips it
+        self.vcfNodes = vcfNodes
+        self.vctNodes = vctNodes
+
+        #an OpeningBook or the path of one, answering its positions without a search
+        if isinstance(book, str):
+            book = OpeningBook(book)
+        self.book = book
+
+        #called with the SearchStats of each move, stats are only collected
+        #when there is a callback or debug logging is enabled
+        self.onStats = onStats
+        self.stats = None
+        self.lastStats = None
+
+        self.workers = workers or 1
+        self.pool = None
+        self.sharedBest = None
+
+        #with ponder set, the position after the opponent's predicted reply is
+        #searched in a thread while the opponent thinks, see startPonder
+        self.ponder = ponder
+        self.ponderThread = None
+        self.ponderReply = None
+        self.ponderResult = None
+        self.ponderDone = False
+        self.ponderStart = None
+        self.ponderHits = 0
+
     def setGame(self, game):
         super().setGame(game)
-        self.gameStatus = MinimaxStatus(game.board, game.turn)
+        self.stopPonder()
+        self.gameStatus = MinimaxStatus(game.board, game.turn, self.radius, game.winLength)
 
     def minimax(self, gameStatus, depth, alpha, beta, maximizing):
+        """Search with the window and score from the point of view of player 1"""
+        if maximizing:
+            return self.negamax(gameStatus, depth, alpha, beta, 1)
+        score, move = self.negamax(gameStatus, depth, -beta, -alpha, 2)
+        return -score, move
 
-        if gameStatus.gameOver or depth == 0:
-            score = gameStatus.getScore(maximizing)
-            return score, (-1,-1)
+    def negamax(self, gameStatus, depth, alpha, beta, player):
+        """Principal variation search for the player to move. Returns the fail-soft
+        score from the point of view of the player and the best move: a score
+        at or below alpha is an upper bound, at or above beta a lower bound."""
 
-        statusKey = gameStatus.key()
-        try:
-            #if this position is already searched, return result from transposition
-            result = self.transpTable[statusKey]
-            return result
-        except KeyError:
-            pass
+        self.nodeNo += 1
+        if self.deadline is not None and self.nodeNo & 0xff == 0 and time.monotonic() > self.deadline:
+            raise SearchTimeout()
 
+        stats = self.stats
+        if gameStatus.gameOver or depth == 0:
+            if stats is not None: stats.leaves += 1
+            score = gameStatus.getScore(player == 1)
+            return (score if player == 1 else -score), (-1,-1)
+
+        #symmetric positions share table entries, with the moves stored in
+        #the canonical orientation
+        code, symmetry = gameStatus.canonical()
+        statusKey, statusCheck = code & HASH_MASK, code >> HASH_BITS
+        alphaOrig = alpha
+
+        entry = self.transpTable.probe(statusKey, statusCheck)
+        if stats is not None:
+            if entry is None: stats.ttMisses += 1
+            else: stats.ttHits += 1
+
+        ttMove = None
+        if entry is not None:
+            ttScore, ttDepth, ttBound, ttMove = entry
+            if ttMove is not None:
+                ttMove = transform(INVERSE[symmetry], *ttMove, gameStatus.size)
+
+            #if this position is already searched deep enough, return result from transposition
+            if ttDepth >= depth and (ttBound == EXACT or
+                    (ttBound == LOWER and ttScore >= beta) or
+                    (ttBound == UPPER and ttScore <= alpha)):
+                if stats is not None: stats.ttCutoffs += 1
+                return ttScore, ttMove
+
+        moves = self.orderMoves(gameStatus, player == 1, ttMove)
+        if not moves:
+            #a full board is a draw
+            return 0, None
+
+        bestScore = -INFINITY
         bestMove = None
-        moves = gameStatus.getPossibleMoves()
-
-        try:
-            #first check the best move for this position from previous round
-            prevBest = self.transpTablePrev[statusKey]
-            moves.appendleft(prevBest[1])
-        except KeyError:
-            pass
-
-        bestScore = -200000
-        if not maximizing:
-            bestScore = 200000
-
-        for move in moves:
-            clone = copy.deepcopy(gameStatus)
-
-            if maximizing: clone.update(*move, 1)
-            else: clone.update(*move, 2)
-
-            score = self.minimax(clone, depth-1, alpha, beta, not maximizing)[0]
-            if maximizing and score > bestScore:
-                bestScore = score
-                alpha = max(alpha, bestScore)
-                bestMove = move
-            elif not maximizing and score < bestScore:
+        opponent = 3 - player
+
+        for index, move in enumerate(moves):
+            gameStatus.update(*move, player)
+            if index == 0:
+                score = -self.negamax(gameStatus, depth-1, -beta, -alpha, opponent)[0]
+            else:
+                #a null window proves the move is no better than the best one so far,
+                #only when it is better is it searched again for its score
+                score = -self.negamax(gameStatus, depth-1, -alpha-1, -alpha, opponent)[0]
+                if alpha < score < beta:
+                    if stats is not None: stats.researches += 1
+                    score = -self.negamax(gameStatus, depth-1, -beta, -score, opponent)[0]
+            gameStatus.undo()
+
+            if score > bestScore:
                 bestScore = score
                 bestMove = move
-                beta = min(beta, bestScore)
+                if score > alpha:
+                    alpha = score
 
-            if beta <= alpha:
+            if alpha >= beta:
+                if stats is not None: stats.cutoff(index)
+                self.addKiller(gameStatus, move, depth, player)
                 break
 
-        if maximizing:
-            retval = alpha, bestMove
+        if bestScore <= alphaOrig:
+            bound = UPPER
+        elif bestScore >= beta:
+            bound = LOWER
         else:
-            retval = beta, bestMove
+            bound = EXACT
 
-        self.transpTable[statusKey] = retval
-        return retval
+        if bestMove is not None:
+            storeMove = transform(symmetry, *bestMove, gameStatus.size)
+        else:
+            storeMove = None
+        self.transpTable.store(statusKey, statusCheck, bestScore, depth, bound, storeMove)
+        if stats is not None: stats.ttStores += 1
+        return bestScore, bestMove
+
+    def newMove(self, size):
+        """Reset the killer moves and age the history scores before a search"""
+        self.killers = {}
+        for player in (1, 2):
+            history = self.historyScores[player]
+            if len(history) != size * size:
+                self.historyScores[player] = [0] * (size * size)
+            else:
+                self.historyScores[player] = [h >> 2 for h in history]
+
+    def addKiller(self, gameStatus, move, depth, player):
+        ply = len(gameStatus.history)
+        killers = self.killers.setdefault(ply, [None, None])
+        if killers[0] != move:
+            killers[0], killers[1] = move, killers[0]
+        history = self.historyScores[player]
+        cell = move[1] * gameStatus.size + move[0]
+        history[cell] = min(history[cell] + depth * depth, HISTORY_MAX)
+
+    def orderMoves(self, gameStatus, maximizing, ttMove=None):
+        """Return the moves to search: the transposition table move, then by
+        the threats the move makes or blocks, killer moves and history scores"""
+        player = 1 if maximizing else 2
+        killers = self.killers.get(len(gameStatus.history), ())
+        history = self.historyScores[player]
+        size = gameStatus.size
+        threats = gameStatus.cellThreats[player]
+
+        #sort keys are threat scores above the killer flag above history scores
+        keys = {}
+        forced = []
+        win = False
+        for move in gameStatus.candidates:
+            x, y = move
+            cell = y * size + x
+            threat = threats[cell]
+            if threat >= BLOCK_WIN:
+                if threat >= WIN: win = True
+                else: forced.append(move)
+
+            key = threat << HISTORY_BITS + 1 | history[cell]
+            if move in killers:
+                key |= 1 << HISTORY_BITS
+            keys[move] = key
+
+        moves = forced if self.forcedResponses and forced and not win else list(keys)
+        moves.sort(key=keys.__getitem__, reverse=True)
+
+        if ttMove is not None and ttMove in moves and moves[0] != ttMove:
+            moves.remove(ttMove)
+            moves.insert(0, ttMove)
+        return moves
 
-        #print(depth, bestScore)
-        #return bestScore, bestMove
+    def bookMove(self):
+        """Return the move, score and depth of the current position in the
+        opening book, or None"""
+        if self.book is None or self.gameStatus.winLength != WIN_LENGTH:
+            return None
+        entry = self.book.lookup(self.gameStatus.board, self.number)
+        if entry is None or self.gameStatus.board.get(*entry[0]) != 0:
+            return None
+        return entry
+
+    def forcedWin(self):
+        """Return a winning line of fours, or of fours and threes, or None"""
+        line = None
+        if self.vcfNodes:
+            line = ThreatSearch(self.gameStatus, self.vcfNodes).vcf(self.number)
+        if line is None and self.vctNodes:
+            line = ThreatSearch(self.gameStatus, self.vctNodes).vct(self.number)
+        return line
+
+    def iterativeDeepening(self):
+        """Search one ply deeper at a time until the time limit runs out and
+        return the result of the deepest completed search"""
+        status = self.gameStatus
+        rootLevel = len(status.history)
+        maxDepth = self.searchDepth or status.size**2 - status.board.count()
+        result = None
+
+        #the first iteration always completes so that there is a move to return
+        self.deadline = None
+        start = time.monotonic()
+
+        for depth in range(1, maxDepth + 1):
+            try:
+                result = self.aspirationSearch(depth, result)
+            except SearchTimeout:
+                while len(status.history) > rootLevel:
+                    status.undo()
+                break
 
-    def requestMove(self):
-        if self.game.lastMove is not None:
-            self.gameStatus.update(*(self.game.lastMove), self.opponentNumber)
-            print(self.gameStatus.possibleMoves)
+            self.completedDepth = depth
+            self.deadline = start + self.timeLimit
+            if time.monotonic() >= self.deadline:
+                break
 
+        self.deadline = None
+        if result is None or result[1] is None:
+            #nothing to search, any empty cell will do
+            empty = status.board.emptyCells()
+            result = 0, empty[0] if empty else None
+        return result
+
+    def aspirationSearch(self, depth, previous):
+        """Search with a window around the score of the previous iteration. When
+        the score falls outside it, that side is opened and the search repeated."""
+        if previous is None or self.workers > 1:
+            return self.searchRoot(depth)
+
+        alpha, beta = previous[0] - ASPIRATION_WINDOW, previous[0] + ASPIRATION_WINDOW
+        while True:
+            score, move = self.searchRoot(depth, alpha, beta)
+            if score <= alpha:
+                alpha = -INFINITY
+            elif score >= beta:
+                beta = INFINITY
+            else:
+                return score, move
+            if self.stats is not None: self.stats.aspirationFails += 1
+
+    def searchRoot(self, depth, alpha=-INFINITY, beta=INFINITY):
+        """Search the current status to the depth with the window and the
+        returned score from the point of view of player 1"""
+        size = self.gameStatus.size
+        if len(self.historyScores[1]) != size * size:
+            self.newMove(size)
+        if self.workers > 1:
+            return self.parallelSearch(depth)
+        return self.minimax(self.gameStatus, depth, alpha, beta, self.number==1)
+
+    def parallelSearch(self, depth):
+        """Search the root moves in worker processes. The workers share the best
+        root score for alpha-beta cutoffs and break ties towards the move that
+        comes first, so the result is the same as with the serial search."""
+        status = self.gameStatus
+        maximizing = self.number == 1
+
+        #table scores are from the point of view of the player to move
+        code, symmetry = status.canonical()
+        entry = self.transpTable.probe(code & HASH_MASK, code >> HASH_BITS)
+        ttMove = None
+        if entry is not None:
+            ttScore, ttDepth, ttBound, ttMove = entry
+            if ttMove is not None:
+                ttMove = transform(INVERSE[symmetry], *ttMove, status.size)
+            if ttDepth >= depth and ttBound == EXACT:
+                return (ttScore if maximizing else -ttScore), ttMove
+        moves = self.orderMoves(status, maximizing, ttMove)
+
+        pool = self.workerPool()
+        with self.sharedBest.get_lock():
+            self.sharedBest[0] = -INFINITY
+            self.sharedBest[1] = len(moves)
+
+        futures = [pool.submit(searchRootMove, status, depth, i, move, maximizing,
+            self.deadline, self.transpTable.age, self.stats is not None) for i, move in enumerate(moves)]
+        try:
+            results = [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+        if None in results:
+            raise SearchTimeout()
+        for nodes, stats in results:
+            self.nodeNo += nodes
+            if stats is not None:
+                self.stats.merge(stats)
+
+        score, move = self.sharedBest[0], moves[self.sharedBest[1]]
+        self.transpTable.store(code & HASH_MASK, code >> HASH_BITS, score, depth, EXACT,
+            transform(symmetry, *move, status.size))
+        return (score if maximizing else -score), move
+
+    def workerPool(self):
+        if self.pool is None:
+            self.sharedBest = multiprocessing.Array('q', 2)
+            self.pool = ProcessPoolExecutor(self.workers, initializer=initWorker,
+                initargs=(self.sharedBest, self.tableMemory, self.forcedResponses))
+        return self.pool
+
+    def predictReply(self):
+        """Return the opponent's expected reply in the current status: the
+        transposition table move, or the move searched first"""
+        status = self.gameStatus
+        code, symmetry = status.canonical()
+        entry = self.transpTable.probe(code & HASH_MASK, code >> HASH_BITS)
+        if entry is not None and entry[3] is not None:
+            move = transform(INVERSE[symmetry], *entry[3], status.size)
+            if status.board.get(*move) == 0:
+                return move
+        moves = self.orderMoves(status, self.opponentNumber == 1)
+        return moves[0] if moves else None
+
+    def startPonder(self):
+        """Search the status after the predicted reply in a thread until
+        stopPonder. The search fills the transposition table, and if the
+        reply is played its move can be played as it is."""
+        reply = self.predictReply()
+        if reply is None:
+            return
+        self.ponderReply, self.ponderResult, self.ponderDone = reply, None, False
+        self.ponderStart = time.monotonic()
+
+        #stopPonder ends the search by moving the deadline, checked as in a timed search
+        self.deadline = math.inf
+        self.ponderThread = threading.Thread(target=self.ponderSearch, args=(reply,), daemon=True)
+        self.ponderThread.start()
+
+    def ponderSearch(self, reply):
+        status = self.gameStatus
+        rootLevel = len(status.history)
+        status.update(*reply, self.opponentNumber)
+        try:
+            self.nodeNo = 0
+            self.newMove(status.size)
+            self.transpTable.newSearch()
+            entry = self.bookMove()
+            line = self.forcedWin() if entry is None else None
+            if entry is not None:
+                move, score, depth = entry
+                self.ponderResult = score, move, depth
+            elif line is not None:
+                self.ponderResult = (1000 if self.number == 1 else -1000), line[0], len(line)
+            else:
+                #the serial search, worker processes could not be stopped
+                maxDepth = self.searchDepth or status.size**2 - status.board.count()
+                for depth in range(1, maxDepth + 1):
+                    score, move = self.minimax(status, depth, -INFINITY, INFINITY, self.number == 1)
+                    self.ponderResult = score, move, depth
+                    if time.monotonic() > self.deadline:
+                        return
+            self.ponderDone = True
+        except SearchTimeout:
+            pass
+        finally:
+            while len(status.history) > rootLevel:
+                status.undo()
+
+    def stopPonder(self):
+        """Stop pondering, return how long it went on or None if it did not"""
+        if self.ponderThread is None:
+            return None
+        self.deadline = 0.0
+        self.ponderThread.join()
+        self.ponderThread = None
+        self.deadline = None
+        return time.monotonic() - self.ponderStart
+
+    def ponderHit(self, reply, elapsed):
+        """Whether the pondered result can be played after the reply, when
+        its search finished or went on for the time limit"""
+        if elapsed is None or reply is None or self.ponderResult is None or tuple(reply) != self.ponderReply:
+            return False
+        return self.ponderDone or (self.timeLimit is not None and elapsed >= self.timeLimit)
+
+    def close(self):
+        """Stop pondering and the worker processes of the parallel search"""
+        self.stopPonder()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def notifyWin(self):
+        self.close()
+
+    def notifyLoss(self):
+        self.close()
+
+    def notifyDraw(self):
+        self.close()
+
+    def search(self):
+        """Find a move for the current status and return (score, move)"""
         self.nodeNo = 0
+        self.newMove(self.gameStatus.size)
+        collect = self.onStats is not None or log.isEnabledFor(logging.DEBUG)
+        self.stats = SearchStats() if collect else None
+        start = time.perf_counter()
+
+        self.transpTable.newSearch()
+        entry = self.bookMove()
+        line = self.forcedWin() if entry is None else None
+        if entry is not None:
+            log.debug("book move: %s", entry)
+            move, score, self.completedDepth = entry
+        elif line is not None:
+            log.debug("forced win: %s", line)
+            score, move = (1000 if self.number == 1 else -1000), line[0]
+            self.completedDepth = len(line)
+        elif self.timeLimit is None:
+            score, move = self.searchRoot(self.searchDepth)
+            self.completedDepth = self.searchDepth
+        else:
+            score, move = self.iterativeDeepening()
+
+        self.reportStats(score, move, start)
+        return score, move
+
+    def ponderedMove(self):
+        """Return the (score, move) of the pondered search"""
+        start = time.perf_counter()
+        collect = self.onStats is not None or log.isEnabledFor(logging.DEBUG)
+        self.stats = SearchStats() if collect else None
+        if self.stats is not None:
+            self.stats.ponderHit = True
+
+        score, move, self.completedDepth = self.ponderResult
+        self.ponderHits += 1
+        self.reportStats(score, move, start)
+        return score, move
+
+    def reportStats(self, score, move, start):
+        stats = self.stats
+        if stats is not None:
+            stats.nodes = self.nodeNo
+            stats.depth = self.completedDepth
+            stats.elapsed = time.perf_counter() - start
+            stats.score, stats.move = score, move
+            log.debug("minimax result: %s", stats)
+            if self.onStats is not None:
+                self.onStats(stats)
+        self.lastStats, self.stats = stats, None
 
-        self.transpTablePrev = self.transpTable
-        self.transpTable = dict()
-        score, move = self.minimax(self.gameStatus, self.searchDepth, -200000, 200000, self.number==1)
+    def requestMove(self):
+        pondered = self.stopPonder()
+        if self.game.lastMove is not None:
+            self.gameStatus.update(*(self.game.lastMove), self.opponentNumber)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("possible moves: %s", list(self.gameStatus.candidates))
 
-        print("minimax result:", score, move)
+        if self.ponderHit(self.game.lastMove, pondered):
+            _, move = self.ponderedMove()
+        else:
+            _, move = self.search()
 
         if not self.gameStatus.onBoard(*move):
-            print("Minimax move not on board!")
+            log.error("Minimax move not on board!")
             exit(-1)
 
-        if self.gameStatus.board[move[1]][move[0]] != 0:
-            print("Minimax tries to play on non-free spot!")
+        if self.gameStatus.board.get(*move) != 0:
+            log.error("Minimax tries to play on non-free spot!")
             exit(-1)
 
         self.gameStatus.update(*move, self.number)
         #print("minimax board: \n",str(self.gameStatus), "\n\n")
 
+        if self.ponder:
+            self.startPonder()
         return move
 
 class MinimaxStatus:
-    def __init__(self, board, turnNo):
-        self.size = len(board)
-        self.board = [x[:] for x in [[0] * self.size] * self.size]
+    def __init__(self, board, turnNo, radius=1, winLength=WIN_LENGTH):
+        board = Board.fromRows(board)
+        checkSize(board.size)
+        self.size = board.size
+        self.winLength = winLength
+        self.board = Board(self.size)
         self.gameOver = False
         self.turnNo = turnNo
         self.lastMove = None
 
-        mid = int(self.size/2)
-        self.possibleMoves = [(mid,mid)]
+        #pattern counts are kept per line and summed up, so that a move only
+        #needs the four lines through it to be re-evaluated
+        self.lines, self.cellLines = boardLines(self.size)
+        self.lineCodes = [emptyLineCode(len(line)) for line in self.lines]
+        self.lineCounts = [NO_PATTERNS] * len(self.lines)
+        self.patterns = [0] * len(NO_PATTERNS)
+        self.lineCountCache = lineCounts.setdefault(winLength, {})
+
+        #threat scores of each cell for both players are the sums of the
+        #scores on the lines through it, kept up to date the same way
+        self.lineCells = boardLineCells(self.size)
+        self.cellThreats = [None, [0] * self.size**2, [0] * self.size**2]
+        self.lineThreatCache = lineThreats.setdefault(winLength, {})
+
+        self.history = []
+        self.hash = 0
+
+        #hashes of the board under each symmetry, the first one is self.hash
+        self.symmetricCodes = symmetricZobrist(self.size)
+        self.hashes = [0] * SYMMETRIES
+
+        #moves are only searched near the marks on the board
+        self.candidates = CandidateMoves(self.size, radius)
+
+        for x, y, mark in board.marks():
+            self.update(x, y, mark)
+
+    def __deepcopy__(self, memo):
+        #line tables and count tuples are never modified in place
+        clone = MinimaxStatus.__new__(MinimaxStatus)
+        clone.__dict__.update(self.__dict__)
+        clone.board = self.board.copy()
+        clone.lineCodes = self.lineCodes[:]
+        clone.lineCounts = self.lineCounts[:]
+        clone.patterns = self.patterns[:]
+        clone.cellThreats = [None, self.cellThreats[1][:], self.cellThreats[2][:]]
+        clone.history = self.history[:]
+        clone.candidates = self.candidates.copy()
+        return clone
+
+    def __getstate__(self):
+        #the rest is rebuilt from the board instead of pickling tables and history
+        return self.board, self.turnNo, self.candidates, self.gameOver, self.lastMove, self.winLength
+
+    def __setstate__(self, state):
+        board, turnNo, candidates, gameOver, lastMove, winLength = state
+        self.__init__(board, 0, candidates.radius, winLength)
+        self.turnNo = turnNo
+        self.candidates = candidates
+        self.gameOver = gameOver
+        self.lastMove = lastMove
 
-        for x in range(self.size):
-            for y in range(self.size):
-                if board[y][x] != 0:
-                    self.update(x,y,int(board[y][x]))
+    def canonical(self):
+        """Return the smallest of the symmetric hashes and the symmetry giving it"""
+        code = min(self.hashes)
+        return code, self.hashes.index(code)
 
     def key(self):
-        return str(self.board)
+        return min(self.hashes) & HASH_MASK
+
+    def keyCheck(self):
+        """Independent hash bits to verify that a table entry is for this position"""
+        return min(self.hashes) >> HASH_BITS
 
     def onBoard(self, x,y):
         return 0 <= x < self.size and 0 <= y < self.size
 
     def getScore(self, maximizing):
+        ev = self.patterns
 
-        lines = []
-        ev = dict()
-        ev["P1"] = self.PlayerScore()
-        ev["P2"] = self.PlayerScore()
-
-        for x in range(self.size):
-            lines.append(self.getDiagonal(x, 0, 1, 1))
-            lines.append(self.getDiagonal(x, 0, -1, 1))
-
-        for x in range(self.size-1):
-            lines.append(self.getDiagonal(0, x+1, 1, 1))
-            lines.append(self.getDiagonal(self.size-1, x+1, -1, 1))
-
-        for row in self.board:
-            lines.append(''.join([str(item) for item in row]))
-
-        for row in zip(*(self.board)):
-            lines.append(''.join([str(item) for item in row]))
-
-        for line in lines: self.evaluateLine(line, ev)
-
-        score = 0
+        if ev[FIVES] or ev[P2 + FIVES]:
+            self.gameOver = True
 
-        lastPlr, nextPlr = "P2", "P1"
+        lastPlr, nextPlr = P2, P1
         if not maximizing:
             lastPlr, nextPlr = nextPlr, lastPlr
 
-        if ev[nextPlr].fives > 0:
+        if ev[nextPlr + FIVES] > 0:
             score = -1000
 
-        elif ev[lastPlr].fives > 0:
+        elif ev[lastPlr + FIVES] > 0:
             score = 1000
 
-        elif ev[nextPlr].openFours > 0 or ev[nextPlr].fours > 0:
+        elif ev[nextPlr + OPEN_FOURS] > 0 or ev[nextPlr + FOURS] > 0:
             score = -900
 
-        elif ev[lastPlr].openFours > 0:
+        elif ev[lastPlr + OPEN_FOURS] > 0:
             score = 800
 
-        elif ev[nextPlr].openThrees > 0 and ev[lastPlr].fours == 0:
-            score = -100 * ev[nextPlr].openThrees
+        elif ev[nextPlr + OPEN_THREES] > 0 and ev[lastPlr + FOURS] == 0:
+            score = -100 * ev[nextPlr + OPEN_THREES]
 
-        elif ev[lastPlr].openThrees + ev[lastPlr].fours > 1:
-            score = 100 * (ev[lastPlr].openThrees + ev[lastPlr].fours)
+        elif ev[lastPlr + OPEN_THREES] + ev[lastPlr + FOURS] > 1:
+            score = 100 * (ev[lastPlr + OPEN_THREES] + ev[lastPlr + FOURS])
 
         else:
-            score = 10 * ev[lastPlr].openThrees + ev[lastPlr].openTwos - ev[nextPlr].openTwos
+            score = 10 * ev[lastPlr + OPEN_THREES] + ev[lastPlr + OPEN_TWOS] - ev[nextPlr + OPEN_TWOS]
 
         return -score if maximizing else score
 
-    def getDiagonal(self, x0, y0, dx, dy):
-        strdiag = ''
-        x, y = x0, y0
+    def countPatterns(self):
+        """Count the patterns of the whole board from scratch"""
+        return Bitboard.fromBoard(self.board, self.winLength).countPatterns()
 
-        while self.onBoard(x,y):
-            strdiag += str(self.board[y][x])
-            x, y = x + dx, y + dy
+    def updateLines(self, x0, y0, player):
+        player = int(player)
+        lineUndo = []
 
-        return strdiag
+        for i, offset in self.cellLines[y0][x0]:
+            code = self.lineCodes[i]
+            oldCounts = self.lineCounts[i]
+            lineUndo.append((i, offset, code, oldCounts))
 
+            newCode = code + (player << 2 * offset)
+            self.changeThreats(i, offset, code, newCode)
+            counts = self.lineCountCache.get(newCode)
+            if counts is None:
+                counts = self.codeCounts(newCode)
+            self.lineCodes[i] = newCode
+            self.lineCounts[i] = counts
 
-    def update(self, x0, y0, player):
-        self.board[y0][x0] = int(player)
-
-        self.possibleMoves = self.getPriorityMoves(x0,y0) + self.possibleMoves
-        self.possibleMoves = list(OrderedDict.fromkeys(self.possibleMoves))
+            if counts != oldCounts:
+                for j in range(len(counts)):
+                    self.patterns[j] += counts[j] - oldCounts[j]
 
-        neighbours = lambda p: [p-1, p, p+1]
-        for x in neighbours(x0):
-            for y in neighbours(y0):
-                if not self.onBoard(x,y):
-                    continue
-                elif self.board[y][x] == 0 and self.possibleMoves.count((x,y)) == 0:
-                    self.possibleMoves.appendleft((x,y))
+        return lineUndo
 
-        try:
-            self.possibleMoves.remove((x0,y0))
-        except(ValueError):
-            pass
+    def update(self, x0, y0, player):
+        self.history.append((x0, y0, self.updateLines(x0, y0, player),
+            self.gameOver, self.lastMove))
+        self.board.set(x0, y0, player)
+        self.hashes = [h ^ c for h, c in zip(self.hashes, self.symmetricCodes[int(player)][y0][x0])]
+        self.hash = self.hashes[0]
+        self.candidates.place(x0, y0)
         self.lastMove = (x0,y0)
         self.turnNo += 1
 
-
-    def getPriorityMoves(self, x0, y0):
-        moves = []
-        dirs = [
-            lambda x,y: (x+1, y),
-            lambda x,y: (x-1, y),
-            lambda x,y: (x, y+1),
-            lambda x,y: (x, y-1),
-            lambda x,y: (x+1, y+1),
-            lambda x,y: (x-1, y+1),
-            lambda x,y: (x+1, y-1),
-            lambda x,y: (x-1, y-1)
-        ]
-
-        for d in dirs:
-            x,y = x0, y0
-            while self.onBoard(x,y):
-                if self.board[y][x] == 0:
-                    moves.append((x,y))
-                    break
-                x,y = d(x,y)
-
-        return moves
-
-
-
-    def evaluateLine(self, line, ev):
-
-        ev["P1"].fives += line.count("11111")
-        ev["P2"].fives += line.count("22222")
-
-        if ev["P1"].fives or ev["P2"].fives:
-            self.gameOver = True
-            return
-
-        ev["P1"].openFours += line.count("011110")
-        ev["P2"].openFours += line.count("022220")
-
-        ev["P1"].fours += line.count("211110")
-        ev["P1"].fours += line.count("011112")
-        ev["P2"].fours += line.count("122220")
-        ev["P2"].fours += line.count("022221")
-
-        ev["P1"].openThrees += line.count("01110")
-        ev["P2"].openThrees += line.count("02220")
-
-        ev["P1"].openTwos += line.count("001100")
-        ev["P2"].openTwos += line.count("002200")
-
-        return
+    def undo(self):
+        """Take back the latest update"""
+        x0, y0, lineUndo, self.gameOver, self.lastMove = self.history.pop()
+        self.candidates.undo()
+        player = self.board.get(x0, y0)
+        self.hashes = [h ^ c for h, c in zip(self.hashes, self.symmetricCodes[player][y0][x0])]
+        self.hash = self.hashes[0]
+        self.board.set(x0, y0, 0)
+        self.turnNo -= 1
+
+        for i, offset, code, oldCounts in lineUndo:
+            counts = self.lineCounts[i]
+            self.changeThreats(i, offset, self.lineCodes[i], code)
+            self.lineCodes[i] = code
+            self.lineCounts[i] = oldCounts
+
+            if counts != oldCounts:
+                for j in range(len(counts)):
+                    self.patterns[j] += oldCounts[j] - counts[j]
+
+
+    def changeThreats(self, i, offset, code, newCode):
+        """Update the cell threat scores for the code of line i changing to
+        newCode at the offset"""
+        cache = self.lineThreatCache
+        old = cache.get(code)
+        if old is None:
+            old = self.codeThreats(code)
+        new = cache.get(newCode)
+        if new is None:
+            new = self.codeThreats(newCode)
+
+        for player in (1, 2):
+            if old[player] != new[player]:
+                #only cells whose threat windows cover the offset can change
+                start = offset - self.winLength if offset > self.winLength else 0
+                end = offset + self.winLength + 1
+                totals = self.cellThreats[player]
+                for cell, a, b in zip(self.lineCells[i][start:end], old[player][start:end], new[player][start:end]):
+                    if a != b:
+                        totals[cell] += b - a
+
+    def threatScore(self, x0, y0, player):
+        """Weigh the threats the player would make and block with a mark on
+        the empty cell (x0, y0), for move ordering"""
+        return self.cellThreats[player][y0 * self.size + x0]
+
+    def codeCounts(self, code):
+        """Count the patterns of both players on the line with the code"""
+        cache = self.lineCountCache
+        counts = cache.get(code)
+        if counts is None:
+            if len(cache) >= LINE_CACHE_SIZE:
+                cache.clear()
+            counts = cache[code] = evaluateLineCounts(codeString(code), self.winLength)
+        return counts
+
+    def codeThreats(self, code):
+        """Return the threat scores of the cells of the line with the code"""
+        cache = self.lineThreatCache
+        threats = cache.get(code)
+        if threats is None:
+            if len(cache) >= LINE_CACHE_SIZE:
+                cache.clear()
+            threats = cache[code] = evaluateLineThreats(codeString(code), self.winLength)
+        return threats
+
+    def evaluateLine(self, line):
+        """Count the patterns of both players on one line"""
+        return self.codeCounts(lineCode(line))
 
     def getPossibleMoves(self):
-        return deque(self.possibleMoves)
+        return deque(self.candidates)
 
     def __str__(self):
-        marks = ['.', 'X', 'O']
-        return '\n'.join([''.join([marks[item] for item in row]) for row in self.board])
-
-    class PlayerScore:
-        openFours = 0
-        fives = 0
-        fours = 0
-        openThrees = 0
-        openTwos = 0
+        return str(self.board)
+
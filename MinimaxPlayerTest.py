@@ -1,64 +1,364 @@
+import copy
+import random
+import time
 import unittest
-from MinimaxPlayer import MinimaxPlayer, MinimaxStatus
+from FiveInRow import FiveInRow
+from FiveInRowPlayers import RandomPlayer
+from MinimaxPlayer import MinimaxPlayer, MinimaxStatus, NO_PATTERNS, INFINITY, evaluateLineThreats
+from Patterns import playerPattern, winThreats
+from Symmetry import SYMMETRIES, transform
 
-class MinimaxPlayerTest(unittest.TestCase):
+def emptyBoard(size=15):
+    return [[0] * size for _ in range(size)]
+
+def randomStatus(rng, stones, size=15, winLength=5):
+    ms = MinimaxStatus(emptyBoard(size), 0, winLength=winLength)
+    for turn in range(stones):
+        while True:
+            x, y = rng.randint(3, size-4), rng.randint(3, size-4)
+            if ms.board[y][x] == 0:
+                break
+        ms.update(x, y, 1 + turn % 2)
+    return ms
 
-    #scoreTable = [0, 1, 2, 10, 50, 10000, 10000]
+def threatsByWindow(line, winLength=5):
+    """Threat scores of the cells of a line, matching the threat patterns
+    on the whole window of cells around each one"""
+    scores = (None, [], [])
+    for offset in range(len(line)):
+        before = line[max(0, offset - winLength):offset]
+        after = line[offset + 1:offset + winLength + 1]
+        k = len(before)
+        for player in (1, 2):
+            score = 0
+            for mark, blocking in ((player, False), (3 - player, True)):
+                window = before + str(mark) + after
+                for patterns, make, block in winThreats(winLength):
+                    patterns = [playerPattern(p, mark) for p in patterns]
+                    if any(window.find(p, max(0, k - len(p) + 1), k + len(p)) >= 0 for p in patterns):
+                        score += block if blocking else make
+                        break
+            scores[player].append(score)
+    return None, tuple(scores[1]), tuple(scores[2])
+
+class MinimaxPlayerTest(unittest.TestCase):
 
     def test_evaluateLine(self):
-        mp = MinimaxStatus("     ",None, None)
-
-        self.assertTrue( mp.evaluateLine("000000000") == 0 )
-        self.assertTrue( mp.evaluateLine("0001001100") == 0 )
-        self.assertTrue( mp.evaluateLine("001110000") == 1 )
-        self.assertTrue( mp.evaluateLine("00111001110000") == 2 )
-        self.assertTrue( mp.evaluateLine("0011110000") == 10 )
-        self.assertTrue( mp.evaluateLine("00111011110000") == 11 )
-        self.assertTrue( mp.evaluateLine("001111100000") == 10000)
-
-        self.assertTrue( mp.evaluateLine("0002001100") == 0 )
-        self.assertTrue( mp.evaluateLine("0022200000") == -1 )
-        self.assertTrue( mp.evaluateLine("0022200111000") == 0 )
-        self.assertTrue( mp.evaluateLine("002222001110") == -9 )
-        self.assertTrue( mp.evaluateLine("002222100000") == 0 )
-        self.assertTrue( mp.evaluateLine("0012222210001110") == -10000)
-
-
-    def test_diagonalStart(self):
-        ms = MinimaxStatus("     ",None,None)
-
-        self.assertTrue(ms.diagonalStartingPoints(1,3) == ((0,2),(4,0)))
-        self.assertTrue(ms.diagonalStartingPoints(3,2) == ((1,0),(4,1)))
-        self.assertTrue(ms.diagonalStartingPoints(1,2) == ((0,1),(3,0)))
-        self.assertTrue(ms.diagonalStartingPoints(3,1) == ((2,0),(4,0)))
-        self.assertTrue(ms.diagonalStartingPoints(3,3) == ((0,0),(4,2)))
-
-        ms = MinimaxStatus("        ",None,None)
-        self.assertTrue(ms.diagonalStartingPoints(3,2) == ((1,0),(5,0)))
-
-    def test_statusUpdate(self):
-
-        board = [
-            [0,0,0,0,0,0,0,0],
-            [0,0,0,0,0,0,0,0],
-            [0,0,0,1,0,0,0,0],
-            [0,0,0,0,1,0,0,0],
-            [0,0,0,0,0,1,0,0],
-            [0,0,0,0,0,0,0,0],
-            [0,0,2,2,2,0,0,0],
-            [0,0,0,0,0,0,0,0]
-        ]
-
-        print(''.join([str(item) for item in board[2]]))
-
-        ms = MinimaxStatus(board, set(), 0)
-
-        ms.update(2,1,1)
-        self.assertTrue(ms.score == 9)
-
-        ms.update(5,6,2)
-        print("score:", ms.score)
-        self.assertTrue(ms.score == 0)
+        ms = MinimaxStatus(emptyBoard(), 0)
+
+        self.assertEqual(ms.evaluateLine("000000000"), NO_PATTERNS)
+        self.assertEqual(ms.evaluateLine("0001001100"), (0, 0, 0, 0, 1, 0, 0, 0, 0, 0))
+        self.assertEqual(ms.evaluateLine("001110000"), (0, 0, 0, 1, 0, 0, 0, 0, 0, 0))
+        self.assertEqual(ms.evaluateLine("00111001110000"), (0, 0, 0, 2, 0, 0, 0, 0, 0, 0))
+        self.assertEqual(ms.evaluateLine("0011110000"), (0, 1, 0, 0, 0, 0, 0, 0, 0, 0))
+        self.assertEqual(ms.evaluateLine("2111100000"), (0, 0, 1, 0, 0, 0, 0, 0, 0, 0))
+        self.assertEqual(ms.evaluateLine("001111100000"), (1, 0, 0, 0, 0, 0, 0, 0, 0, 0))
+
+        self.assertEqual(ms.evaluateLine("0022200000"), (0, 0, 0, 0, 0, 0, 0, 0, 1, 0))
+        self.assertEqual(ms.evaluateLine("002222100000"), (0, 0, 0, 0, 0, 0, 0, 1, 0, 0))
+        self.assertEqual(ms.evaluateLine("0012222210001110"), (0, 0, 0, 1, 0, 1, 0, 0, 0, 0))
+
+    def test_incrementalPatterns(self):
+        rng = random.Random(1)
+
+        for _ in range(20):
+            ms = randomStatus(rng, rng.randint(1, 60))
+            self.assertEqual(ms.patterns, ms.countPatterns())
+
+            for _ in range(rng.randint(1, len(ms.history))):
+                ms.undo()
+                self.assertEqual(ms.patterns, ms.countPatterns())
+
+    def test_threatScore(self):
+        rng = random.Random(7)
+
+        for _ in range(10):
+            ms = randomStatus(rng, rng.randint(1, 40))
+            for _ in range(rng.randint(0, len(ms.history))):
+                ms.undo()
+
+            fresh = MinimaxStatus(ms.board, 0)
+            self.assertEqual(ms.cellThreats, fresh.cellThreats)
+
+    def test_threatTable(self):
+        rng = random.Random(11)
+        for winLength in (5, 6, 7):
+            for _ in range(300):
+                line = "".join(rng.choice("0001122") for _ in range(rng.randint(1, 20)))
+                self.assertEqual(evaluateLineThreats(line, winLength), threatsByWindow(line, winLength), line)
+
+    def test_winLength(self):
+        rng = random.Random(9)
+
+        for _ in range(10):
+            ms = randomStatus(rng, rng.randint(1, 80), 19, 6)
+            for _ in range(rng.randint(0, len(ms.history))):
+                ms.undo()
+
+            fresh = MinimaxStatus(ms.board, 0, winLength=6)
+            self.assertEqual(ms.patterns, ms.countPatterns())
+            self.assertEqual(ms.cellThreats, fresh.cellThreats)
+
+        #five in a row is an open four when six wins
+        board = emptyBoard(19)
+        for x in range(5, 10):
+            board[7][x] = 1
+        ms = MinimaxStatus(board, 0, winLength=6)
+        self.assertEqual(ms.getScore(False), 800)
+        self.assertFalse(ms.gameOver)
+
+        player = MinimaxPlayer(2)
+        game = FiveInRow(RandomPlayer(), player, 19, 6)
+        for x in range(5, 10):
+            game.setBoardPos(x, 7, 1)
+        game.turn = 5
+        player.setGame(game)
+        self.assertIn(player.requestMove(), [(4, 7), (10, 7)])
+
+    def test_orderMoves(self):
+        ms = MinimaxStatus(emptyBoard(), 0)
+        for x in [5, 6, 7, 8]:
+            ms.update(x, 7, 1)
+        for x, y in [(5, 9), (6, 9), (7, 9)]:
+            ms.update(x, y, 2)
+
+        player = MinimaxPlayer(2)
+        player.newMove(ms.size)
+
+        #player 2 has to block the four, player 1 wins first
+        self.assertEqual(sorted(player.orderMoves(ms, False)), [(4, 7), (9, 7)])
+        self.assertIn(player.orderMoves(ms, True)[0], [(4, 7), (9, 7)])
+
+        player.forcedResponses = False
+        moves = player.orderMoves(ms, False)
+        self.assertEqual(sorted(moves[:2]), [(4, 7), (9, 7)])
+        self.assertEqual(sorted(moves), sorted(ms.candidates))
+
+    def test_undo(self):
+        rng = random.Random(2)
+        ms = randomStatus(rng, 30)
+        ms.getScore(True)
+
+        state = lambda: (str(ms.board), list(ms.getPossibleMoves()), ms.gameOver,
+            ms.lastMove, ms.turnNo, list(ms.patterns))
+        before = state()
+
+        for move in list(ms.getPossibleMoves())[:10]:
+            ms.update(*move, 1)
+            ms.getScore(False)
+            ms.undo()
+            self.assertEqual(state(), before)
+
+    def test_key(self):
+        a = MinimaxStatus(emptyBoard(), 0)
+        b = MinimaxStatus(emptyBoard(), 0)
+        empty = (a.key(), a.keyCheck())
+
+        for move in [(7, 7, 1), (8, 8, 2), (6, 7, 1)]:
+            a.update(*move)
+        for move in [(6, 7, 1), (8, 8, 2), (7, 7, 1)]:
+            b.update(*move)
+        self.assertEqual((a.key(), a.keyCheck()), (b.key(), b.keyCheck()))
+
+        b.undo()
+        self.assertNotEqual(a.key(), b.key())
+
+        for _ in range(2):
+            b.undo()
+        self.assertEqual((b.key(), b.keyCheck()), empty)
+
+    def test_symmetricKey(self):
+        rng = random.Random(5)
+        a = randomStatus(rng, 12)
+        marks = [(x, y, mark) for x, y, mark in a.board.marks()]
+
+        player = MinimaxPlayer(2)
+        player.setNumber(1)
+        player.newMove(a.size)
+        score, move = player.minimax(a, 2, -200000, 200000, True)
+
+        for s in range(SYMMETRIES):
+            b = MinimaxStatus(emptyBoard(), 0)
+            for x, y, mark in marks:
+                b.update(*transform(s, x, y, b.size), mark)
+            self.assertEqual((b.key(), b.keyCheck()), (a.key(), a.keyCheck()))
+
+            #the table entry of a is reused for b with the move mapped to b
+            nodes = player.nodeNo
+            self.assertEqual(player.minimax(b, 2, -200000, 200000, True),
+                (score, transform(s, *move, b.size)))
+            self.assertEqual(player.nodeNo, nodes + 1)
+
+    def test_failSoft(self):
+        rng = random.Random(7)
+
+        def search(status, alpha, beta):
+            player = MinimaxPlayer(3)
+            player.newMove(status.size)
+            return player.minimax(copy.deepcopy(status), 3, alpha, beta, True)[0]
+
+        for _ in range(3):
+            status = randomStatus(rng, 10)
+            score = search(status, -INFINITY, INFINITY)
+
+            #outside the window the score is a bound on the side of the true score
+            self.assertTrue(score <= search(status, score + 1, score + 50) <= score + 1)
+            self.assertTrue(score - 1 <= search(status, score - 50, score - 1) <= score)
+            self.assertEqual(search(status, score - 1, score + 1), score)
+
+    def test_aspirationSearch(self):
+        rng = random.Random(8)
+
+        for _ in range(3):
+            status = randomStatus(rng, 10)
+            results = []
+            for player in [MinimaxPlayer(3), MinimaxPlayer(3, timeLimit=60)]:
+                player.gameStatus = copy.deepcopy(status)
+                player.setNumber(1)
+                player.vcfNodes = player.vctNodes = 0
+                results.append(player.search())
+            self.assertEqual(results[0], results[1])
+
+    def test_getScore(self):
+        board = emptyBoard()
+        for x in range(5, 8):
+            board[7][x] = 1
+        board[0][0] = 2
+        board[0][14] = 2
+
+        #player 2 to move against an open three
+        ms = MinimaxStatus(board, 0)
+        self.assertEqual(ms.getScore(False), 10)
+        self.assertFalse(ms.gameOver)
+
+        ms.update(8, 7, 1)
+        ms.update(9, 7, 1)
+        self.assertEqual(ms.getScore(False), 1000)
+        self.assertTrue(ms.gameOver)
+
+    def test_timeLimit(self):
+        player = MinimaxPlayer(timeLimit=0.3)
+        game = FiveInRow(RandomPlayer(), player)
+
+        for move in [(5, 5), (4, 4), (6, 6), (0, 14), (7, 7), (14, 0), (8, 8)]:
+            game.setBoardPos(*move, 1 + game.turn % 2)
+            game.turn += 1
+        player.setGame(game)
+
+        start = time.monotonic()
+        move = player.requestMove()
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertGreaterEqual(player.completedDepth, 1)
+
+        #the four has to be blocked
+        self.assertEqual(move, (9, 9))
+        self.assertEqual(len(player.gameStatus.history), 8)
+
+    def test_timeLimitCrowdedBoard(self):
+        rng = random.Random(8)
+        board = emptyBoard()
+        cells = rng.sample([(x, y) for x in range(15) for y in range(15)], 150)
+        for i, (x, y) in enumerate(cells):
+            board[y][x] = 1 + i % 2
+
+        #the turn number counts the marks twice, as after FiveInRow.playOpening
+        player = MinimaxPlayer(timeLimit=0.05, vcfNodes=0, vctNodes=0)
+        player.setNumber(1)
+        player.gameStatus = MinimaxStatus(board, 150)
+        _, move = player.search()
+        self.assertEqual(board[move[1]][move[0]], 0)
+
+    def test_parallelSearch(self):
+        rng = random.Random(5)
+
+        for _ in range(3):
+            status = randomStatus(rng, 10)
+            moves = []
+
+            for workers in [None, 2]:
+                player = MinimaxPlayer(2, tableMemory=2**16, workers=workers)
+                player.gameStatus = copy.deepcopy(status)
+                player.setNumber(1)
+                moves.append(player.searchRoot(2))
+                player.close()
+
+            self.assertEqual(moves[0], moves[1])
+
+    def test_searchStats(self):
+        collected = []
+        player = MinimaxPlayer(3, tableMemory=2**16, onStats=collected.append)
+        game = FiveInRow(RandomPlayer(), player)
+        game.tick()
+        game.tick()
+
+        stats = collected[0]
+        self.assertEqual(len(collected), 1)
+        self.assertEqual(stats.nodes, player.nodeNo)
+        self.assertEqual(stats.move, game.moves[1])
+        self.assertEqual(stats.depth, 3)
+        self.assertGreater(stats.leaves, 0)
+        self.assertEqual(stats.ttHits + stats.ttMisses, stats.nodes - stats.leaves)
+        self.assertGreater(sum(stats.betaCutoffs), 0)
+
+        #nothing is collected without a callback
+        player.onStats = None
+        game.tick()
+        game.tick()
+        self.assertIsNone(player.lastStats)
+        self.assertEqual(len(collected), 1)
+
+    def reply(self, game, move):
+        game.placeMove(move)
+        game.endTurn(move)
+
+    def test_ponder(self):
+        collected = []
+        player = MinimaxPlayer(2, tableMemory=2**16, onStats=collected.append, ponder=True)
+        game = FiveInRow(player, RandomPlayer())
+        game.tick()
+        player.ponderThread.join()
+        self.assertTrue(player.ponderDone)
+
+        #the predicted reply is answered with the pondered move
+        self.reply(game, player.ponderReply)
+        pondered = player.ponderResult[1]
+        game.tick()
+        self.assertEqual(player.ponderHits, 1)
+        self.assertEqual(game.moves[-1], pondered)
+        self.assertTrue(collected[-1].ponderHit)
+
+        #any other reply is searched
+        player.ponderThread.join()
+        self.assertTrue((player.gameStatus.board.cells == game.board.cells).all())
+        move = next(move for move in game.board.emptyCells() if move != player.ponderReply)
+        self.reply(game, move)
+        game.tick()
+        self.assertEqual(player.ponderHits, 1)
+        self.assertFalse(collected[-1].ponderHit)
+        player.close()
+        self.assertTrue((player.gameStatus.board.cells == game.board.cells).all())
+
+    def test_stopPonder(self):
+        player = MinimaxPlayer(timeLimit=0.05, tableMemory=2**16, ponder=True)
+        game = FiveInRow(player, RandomPlayer())
+        game.tick()
+        time.sleep(0.01)
+
+        #a timed ponder goes on until the reply comes
+        self.assertTrue(player.ponderThread.is_alive())
+        self.reply(game, player.ponderReply)
+        start = time.monotonic()
+        game.tick()
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(player.ponderHits, 0)
+
+        time.sleep(0.1)
+        self.reply(game, player.ponderReply)
+        game.tick()
+        self.assertEqual(player.ponderHits, 1)
+        player.close()
+        self.assertIsNone(player.ponderThread)
+        self.assertEqual(len(player.gameStatus.history), 5)
 
 if __name__ == '__main__':
     unittest.main()
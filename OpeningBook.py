@@ -0,0 +1,169 @@
+import argparse
+import csv
+import mmap
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from Board import Board
+from GameRecord import isArchive, readGames
+from Symmetry import INVERSE, canonicalHash, transform
+from Zobrist import HASH_BITS, HASH_MASK, zobristTable
+
+#a book file is a header and records sorted by key and check:
+#magic, board size, record count, fingerprint of the zobrist codes
+#key, check, move, score, depth
+MAGIC = b"FIRBOOK1"
+HEADER = struct.Struct("<8sHxxIQ")
+RECORD = struct.Struct("<QIHiB5x")
+
+#hashed into the positions where player 2 is to move
+SIDE_CODE = 0x5bd1e995_9e3779b97f4a7c15
+
+def zobristFingerprint(size):
+    return zobristTable(size)[1][0][0] & HASH_MASK
+
+def positionKey(board, player):
+    """Return the key and check value of the position under its canonical
+    symmetry, and the symmetry mapping the board to it"""
+    code, symmetry = canonicalHash(board)
+    if player == 2:
+        code ^= SIDE_CODE
+    return code & HASH_MASK, code >> HASH_BITS, symmetry
+
+class OpeningBook:
+    """Best moves of positions in a file of fixed size records sorted by
+    the symmetry canonical position key.
+
+    The file is memory mapped and searched in place, so opening a book is
+    fast and processes using the same book share its pages. Moves are
+    stored in the canonical orientation and mapped back on lookup."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.size, self.count, fingerprint = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError("%s is not an opening book" % path)
+        if fingerprint != zobristFingerprint(self.size):
+            raise ValueError("%s was built with different zobrist codes" % path)
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.map.close()
+
+    def record(self, i):
+        return RECORD.unpack_from(self.map, HEADER.size + i * RECORD.size)
+
+    def find(self, key, check):
+        """Return the (move, score, depth) record of the canonical position, or None"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.record(mid)[:2] < (key, check):
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < self.count:
+            recordKey, recordCheck, move, score, depth = self.record(lo)
+            if (recordKey, recordCheck) == (key, check) and move:
+                move -= 1
+                return (move >> 8, move & 0xff), score, depth
+        return None
+
+    def lookup(self, board, player):
+        """Return the move, score and depth of the position with the player
+        to move, or None if it is not in the book"""
+        if board.size != self.size:
+            return None
+        key, check, symmetry = positionKey(board, player)
+        entry = self.find(key, check)
+        if entry is None:
+            return None
+        move, score, depth = entry
+        return transform(INVERSE[symmetry], *move, self.size), score, depth
+
+def bookEntry(board, player, move, score, depth):
+    """Return the record of a position and its move in the canonical orientation"""
+    key, check, symmetry = positionKey(board, player)
+    x, y = transform(symmetry, *move, board.size)
+    return key, check, ((x << 8) | y) + 1, score, depth
+
+def writeBook(path, size, records):
+    """Write the records to a book file, keeping the deepest one of each position"""
+    positions = {}
+    for record in records:
+        old = positions.get(record[:2])
+        if old is None or record[4] > old[4]:
+            positions[record[:2]] = record
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, size, len(positions), zobristFingerprint(size)))
+        for key in sorted(positions):
+            f.write(RECORD.pack(*positions[key]))
+
+def bookPositions(lines, plies, size=15):
+    """Return the positions after the first moves of the game lines as
+    (board, player to move), one of each canonical position"""
+    positions = {}
+    for line in lines:
+        board = Board(size)
+        for ply, move in enumerate(line[:plies]):
+            player = 1 + ply % 2
+            key = positionKey(board, player)[:2]
+            if key not in positions:
+                positions[key] = (board.copy(), player)
+            board.set(*move, player)
+    return list(positions.values())
+
+def searchBookPosition(board, player, depth):
+    #imported here, MinimaxPlayer itself uses opening books
+    from MinimaxPlayer import MinimaxPlayer, MinimaxStatus
+
+    searcher = MinimaxPlayer(depth)
+    searcher.setNumber(player)
+    searcher.gameStatus = MinimaxStatus(board, 0)
+    score, move = searcher.search()
+    return bookEntry(board, player, move, score, searcher.completedDepth)
+
+def buildBook(path, lines, plies=8, depth=4, size=15, workers=None):
+    """Search the positions of the first plies of the game lines and write
+    the best moves found to a book file"""
+    positions = bookPositions(lines, plies, size)
+    boards = [board for board, _ in positions]
+    players = [player for _, player in positions]
+    with ProcessPoolExecutor(workers) as pool:
+        records = list(pool.map(searchBookPosition, boards, players, [depth] * len(positions)))
+    writeBook(path, size, records)
+    return len(records)
+
+def readGameLines(path):
+    """Read the game lines of a game archive or a SelfPlay results file"""
+    if isArchive(path):
+        return [game.moves for game in readGames(path)]
+
+    from SelfPlay import parseOpening
+    with open(path, newline="") as f:
+        return [parseOpening(row["line"]) for row in csv.DictReader(f)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an opening book from self-play games")
+    parser.add_argument("games", nargs="+", help="game archives or SelfPlay results files")
+    parser.add_argument("-o", "--output", default="book.bin")
+    parser.add_argument("-p", "--plies", type=int, default=8, help="moves of each game to put in the book")
+    parser.add_argument("-d", "--depth", type=int, default=4, help="search depth of the book moves")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    lines = [line for path in args.games for line in readGameLines(path)]
+    count = buildBook(args.output, lines, args.plies, args.depth, workers=args.workers)
+    print("%d positions, %d bytes" % (count, os.path.getsize(args.output)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
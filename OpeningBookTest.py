@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from Board import Board
+from FiveInRow import FiveInRow
+from FiveInRowPlayers import RandomPlayer
+from MinimaxPlayer import MinimaxPlayer
+from OpeningBook import OpeningBook, bookEntry, bookPositions, writeBook
+from Symmetry import SYMMETRIES, INVERSE, transform
+
+class OpeningBookTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_symmetries(self):
+        for s in range(SYMMETRIES):
+            cells = {transform(s, x, y, 7) for x in range(7) for y in range(7)}
+            self.assertEqual(len(cells), 49)
+            self.assertEqual(transform(INVERSE[s], *transform(s, 1, 5, 7), 7), (1, 5))
+
+    def test_lookup(self):
+        board = Board(15)
+        board.set(7, 7, 1)
+        board.set(8, 6, 2)
+        writeBook(self.path, 15, [bookEntry(board, 1, (9, 5), 12, 4), bookEntry(Board(15), 1, (7, 7), 0, 4)])
+
+        book = OpeningBook(self.path)
+        self.assertEqual(len(book), 2)
+        self.assertEqual(book.lookup(board, 1), ((9, 5), 12, 4))
+        self.assertIsNone(book.lookup(board, 2))
+
+        #rotations and reflections of the position get the same move mapped to them
+        for s in range(SYMMETRIES):
+            rotated = Board(15)
+            for x, y, mark in board.marks():
+                rotated.set(*transform(s, x, y, 15), mark)
+            self.assertEqual(book.lookup(rotated, 1), (transform(s, 9, 5, 15), 12, 4))
+        book.close()
+
+    def test_bookPositions(self):
+        lines = [[(7, 7), (8, 8), (6, 6)], [(7, 7), (6, 6), (8, 8)], [(7, 7), (8, 7), (6, 6)]]
+        #(8, 8) and (6, 6) are the same move by symmetry
+        self.assertEqual(len(bookPositions(lines, 2)), 2)
+        self.assertEqual(len(bookPositions(lines, 3)), 4)
+
+    def test_bookMove(self):
+        board = Board(15)
+        board.set(7, 7, 1)
+        writeBook(self.path, 15, [bookEntry(board, 2, (0, 0), 0, 4)])
+
+        player = MinimaxPlayer(3, book=self.path)
+        game = FiveInRow(RandomPlayer(), player)
+        game.setBoardPos(7, 7, 1)
+        game.lastMove = (7, 7)
+        game.changeTurn()
+
+        self.assertEqual(player.requestMove(), (0, 0))
+        self.assertEqual(player.nodeNo, 0)
+        player.book.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+#marks in a row needed to win, at least 5 so that the shapes below stay apart
+WIN_LENGTH = 5
+
+#indices to the pattern counts, player 2 counts follow player 1 counts
+P1, P2 = 0, 5
+FIVES, OPEN_FOURS, FOURS, OPEN_THREES, OPEN_TWOS = range(5)
+NO_PATTERNS = (0,) * 10
+
+def checkWinLength(winLength):
+    if winLength < WIN_LENGTH:
+        raise ValueError("win length must be at least %d, got %d" % (WIN_LENGTH, winLength))
+
+#patterns of player 1 marks, 2 is the opponent and 0 an empty cell. The
+#names are those of five in a row, with longer wins the runs of marks are
+#as much longer.
+@lru_cache(maxsize=None)
+def winPatterns(winLength=WIN_LENGTH):
+    checkWinLength(winLength)
+    run = lambda k: "1" * (winLength - 5 + k)
+    return [
+        (FIVES, [run(5)]),
+        (OPEN_FOURS, ["0" + run(4) + "0"]),
+        (FOURS, ["2" + run(4) + "0", "0" + run(4) + "2"]),
+        (OPEN_THREES, ["0" + run(3) + "0"]),
+        (OPEN_TWOS, ["00" + run(2) + "00"]),
+    ]
+
+PATTERNS = winPatterns(WIN_LENGTH)
+
+def playerPattern(pattern, player):
+    """Return the pattern as seen by the given player"""
+    return pattern if player == 1 else pattern.translate(str.maketrans("12", "21"))
+
+def overlaps(pattern):
+    """Return the offsets at which two occurrences of the pattern can overlap"""
+    return [k for k in range(1, len(pattern)) if pattern[k:] == pattern[:-k]]
+
+#lines a mark can make, strongest first, with the move ordering weights for
+#making them and for blocking the opponent from making them. A move makes at
+#most one threat on each of its four lines, so the weights are 8 times apart.
+#Every threat has two marks next to each other.
+@lru_cache(maxsize=None)
+def winThreats(winLength=WIN_LENGTH):
+    checkWinLength(winLength)
+    run = lambda k: "1" * (winLength - 5 + k)
+    #one mark short of a win with the gap anywhere, and open threes solid or with a gap
+    fours = ["1" * k + "0" + "1" * (winLength - 1 - k) for k in range(winLength)]
+    threes = ["0" + run(3) + "0"]
+    threes += ["0" + "1" * k + "0" + "1" * (winLength - 2 - k) + "0" for k in range(1, winLength - 2)]
+    return [
+        ([run(5)], 8**8, 8**7),
+        (["0" + run(4) + "0"], 8**6, 8**5),
+        (fours, 8**4, 8),
+        (threes, 8**3, 8**2),
+        (["00" + run(2) + "00"], 1, 0),
+    ]
+
+THREATS = winThreats(WIN_LENGTH)
+WIN, BLOCK_WIN = THREATS[0][1:]
@@ -1,13 +1,15 @@
 #!/usr/bin/python3
 # -*- coding: utf-8 -*-
 
+import asyncio
 import sys
+from concurrent.futures import Future
 from PyQt5.QtCore import pyqtSignal
 from PyQt5.QtWidgets import QWidget, QGridLayout, QPushButton, QApplication, QMessageBox
 from FiveInRow import FiveInRow
 from FiveInRowPlayers import FiveInRowPlayer
+from GameController import GameController
 from MinimaxPlayer import MinimaxPlayer
-from time import sleep
 
 class FiveInRowCell(QPushButton):
     def __init__(self, txt, x, y):
@@ -34,7 +36,6 @@ class FiveInRowGui(QWidget):
         self.setLayout(self.grid)
 
         self.player = None
-        self.move = None
         self.gameOver = False
 
         self.setWindowTitle('FiveInRow')
@@ -47,23 +48,19 @@ class FiveInRowGui(QWidget):
         return 'QPushButton {color: ' + color + '; font-size: 24pt;}'
 
     def cellClicked(self):
-        if self.move is None:
-            self.move = self.sender().getCoordinates()
-        if self.player is not None:
-            idx = self.player.number
-            self.sender().setText(self.symbols[idx])
-            self.sender().setStyleSheet(self.colorToStyle(self.colors[idx]))
-        print(self.move)
+        move = self.sender().getCoordinates()
+        if self.player is None or not self.player.moveClicked(move):
+            return
+        idx = self.player.number
+        self.sender().setText(self.symbols[idx])
+        self.sender().setStyleSheet(self.colorToStyle(self.colors[idx]))
+        print(move)
 
     def startTurn(self, player):
         #self.constructBoard(board)
-        self.move = None
         self.player = player
         self.startSignal.emit()
 
-    def getMove(self):
-        return self.move
-
     def endGame(self, winner):
         if self.gameOver:
             return
@@ -96,17 +93,33 @@ class FiveInRowGui(QWidget):
                 self.grid.addWidget(cellButton, x, y)
 
 class QtPlayer(FiveInRowPlayer):
+    """A player clicking the cells of the gui. A move request is a future
+    that the next click completes, so waiting for it takes no polling."""
+
     def __init__(self, gui):
         super().__init__()
         self.gui = gui
+        self.pendingMove = None
 
-    def requestMove(self):
+    def startRequest(self):
+        self.pendingMove = Future()
         self.gui.startTurn(self)
-        move = None
-        while move is None:
-            sleep(0.2)
-            move = self.gui.getMove()
-        return move
+        return self.pendingMove
+
+    def moveClicked(self, move):
+        """Complete the pending move request with the clicked cell, return
+        False if no move was requested"""
+        future, self.pendingMove = self.pendingMove, None
+        if future is None:
+            return False
+        future.set_result(move)
+        return True
+
+    def requestMove(self):
+        return self.startRequest().result()
+
+    async def requestMoveAsync(self, executor=None):
+        return await asyncio.wrap_future(self.startRequest())
 
     def notifyWin(self):
         self.gui.startTurn(self)
@@ -128,10 +141,15 @@ if __name__ == '__main__':
 
     p1 = QtPlayer(gamegui)
     #p2 = QtPlayer(gamegui)
-    p2 = MinimaxPlayer(5)
+    p2 = MinimaxPlayer(5, ponder=True)
 
+    #the games run on the controller's loop, the gui keeps the main thread
+    controller = GameController()
+    controller.startThread()
     game = FiveInRow(p1, p2)
-    game.start()
+    game.maxInvalidMoves = None
+    controller.submit(game)
 
-    sys.exit(app.exec_())
-    game.join()
+    status = app.exec_()
+    controller.stopThread()
+    sys.exit(status)
@@ -0,0 +1,74 @@
+from Patterns import WIN_LENGTH
+
+#marks the border around the board, never equal to a player
+BORDER = 3
+
+class Referee:
+    """Move validity and wins of one game, kept as the stones are placed.
+
+    The cells are a flat bytearray with a border of one cell around the
+    board, so stepping along a row, column or diagonal needs no bounds
+    checks. A win is found by walking the run of marks through a placed
+    stone, at most winLength - 1 cells each way, so the cost of a move
+    does not depend on the board size."""
+
+    def __init__(self, size=15, winLength=WIN_LENGTH):
+        self.size = size
+        self.winLength = winLength
+        self.width = size + 2
+        self.cells = bytearray([BORDER]) * (self.width * self.width)
+        for y in range(size):
+            start = self.index(0, y)
+            self.cells[start:start + size] = bytes(size)
+        self.steps = (1, self.width, self.width + 1, self.width - 1)
+        self.count = 0
+
+    def index(self, x, y):
+        return (y + 1) * self.width + x + 1
+
+    def isFree(self, x, y):
+        """Whether (x, y) is an empty cell on the board"""
+        return 0 <= x < self.size and 0 <= y < self.size and self.cells[self.index(x, y)] == 0
+
+    def set(self, x, y, mark):
+        i = self.index(x, y)
+        self.count += (mark != 0) - (self.cells[i] != 0)
+        self.cells[i] = mark
+
+    def isFull(self):
+        return self.count == self.size * self.size
+
+    def runLength(self, x, y):
+        """Length of the longest row of marks through the mark at (x, y),
+        counting at most winLength - 1 marks on either side of it"""
+        cells = self.cells
+        i = self.index(x, y)
+        mark = cells[i]
+        if mark == 0 or mark == BORDER:
+            return 0
+
+        reach = self.winLength - 1
+        longest = 0
+        for step in self.steps:
+            run = 1
+            j = i + step
+            end = i + reach * step
+            while cells[j] == mark:
+                run += 1
+                if j == end:
+                    break
+                j += step
+            j = i - step
+            end = i - reach * step
+            while cells[j] == mark:
+                run += 1
+                if j == end:
+                    break
+                j -= step
+            if run > longest:
+                longest = run
+        return longest
+
+    def winsAt(self, x, y):
+        """Whether the mark at (x, y) is part of a winning row"""
+        return self.runLength(x, y) >= self.winLength
@@ -0,0 +1,60 @@
+import random
+import unittest
+from Bitboard import Bitboard
+from Board import Board
+from FiveInRow import FiveInRow, MAX_INVALID_MOVES
+from FiveInRowPlayers import FiveInRowPlayer, RandomPlayer
+from Referee import Referee
+
+class StubbornPlayer(FiveInRowPlayer):
+    """Always tries the same move"""
+
+    def __init__(self, move):
+        super().__init__()
+        self.move = move
+        self.tries = 0
+
+    def requestMove(self):
+        self.tries += 1
+        return self.move
+
+class RefereeTest(unittest.TestCase):
+
+    def test_winsAt(self):
+        rng = random.Random(3)
+        for size, winLength in [(5, 5), (9, 5), (15, 5), (15, 6), (19, 7)]:
+            for _ in range(50):
+                board = Board(size)
+                referee = Referee(size, winLength)
+                for _ in range(rng.randrange(size * size)):
+                    x, y, mark = rng.randrange(size), rng.randrange(size), rng.randint(0, 2)
+                    board.set(x, y, mark)
+                    referee.set(x, y, mark)
+
+                bitboard = Bitboard.fromBoard(board, winLength)
+                self.assertEqual(referee.count, board.count())
+                for y in range(size):
+                    for x in range(size):
+                        self.assertEqual(referee.winsAt(x, y), bitboard.winsAt(x, y))
+                        self.assertEqual(referee.isFree(x, y), board.get(x, y) == 0)
+
+    def test_isFree(self):
+        referee = Referee(7)
+        for x, y in [(-1, 0), (0, -1), (7, 0), (0, 7), (8, 8)]:
+            self.assertFalse(referee.isFree(x, y))
+        self.assertTrue(referee.isFree(6, 6))
+
+    def test_forfeit(self):
+        player = StubbornPlayer((20, 20))
+        game = FiveInRow(player, RandomPlayer())
+        self.assertEqual(game.play(), 2)
+        self.assertEqual(player.tries, MAX_INVALID_MOVES)
+        self.assertEqual(game.moves, [])
+
+        player = StubbornPlayer("7,7")
+        game = FiveInRow(RandomPlayer(), player)
+        self.assertEqual(game.play(), 1)
+        self.assertEqual(len(game.moves), 1)
+
+if __name__ == '__main__':
+    unittest.main()
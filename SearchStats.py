@@ -0,0 +1,81 @@
+class SearchStats:
+    """Counters of one MinimaxPlayer.requestMove search.
+
+    MinimaxPlayer only collects them when a stats callback is set or its
+    logger is enabled for debug messages, otherwise its stats are None."""
+
+    def __init__(self):
+        self.nodes = 0
+        self.leaves = 0
+        self.ttHits = 0
+        self.ttMisses = 0
+        self.ttCutoffs = 0
+        self.ttStores = 0
+        self.betaCutoffs = []
+        self.researches = 0
+        self.aspirationFails = 0
+        self.ponderHit = False
+        self.depth = 0
+        self.elapsed = 0.0
+        self.score = None
+        self.move = None
+
+    def cutoff(self, moveIndex):
+        """Count a beta cutoff caused by the move at the index of the move list"""
+        if moveIndex >= len(self.betaCutoffs):
+            self.betaCutoffs.extend([0] * (moveIndex + 1 - len(self.betaCutoffs)))
+        self.betaCutoffs[moveIndex] += 1
+
+    def merge(self, other):
+        """Add the counters of a search done elsewhere, e.g. in a worker process"""
+        self.nodes += other.nodes
+        self.leaves += other.leaves
+        self.ttHits += other.ttHits
+        self.ttMisses += other.ttMisses
+        self.ttCutoffs += other.ttCutoffs
+        self.ttStores += other.ttStores
+        self.researches += other.researches
+        self.aspirationFails += other.aspirationFails
+        for i, count in enumerate(other.betaCutoffs):
+            if i == len(self.betaCutoffs):
+                self.betaCutoffs.append(0)
+            self.betaCutoffs[i] += count
+
+    def branchingFactor(self):
+        """Effective branching factor, the depth-th root of the nodes visited"""
+        if self.depth <= 0 or self.nodes <= 1:
+            return 0.0
+        return self.nodes ** (1 / self.depth)
+
+    def firstMoveCutoffRate(self):
+        """Share of the beta cutoffs caused by the first move searched"""
+        total = sum(self.betaCutoffs)
+        return self.betaCutoffs[0] / total if total else 0.0
+
+    def asDict(self):
+        return {
+            "nodes": self.nodes,
+            "leaves": self.leaves,
+            "ttHits": self.ttHits,
+            "ttMisses": self.ttMisses,
+            "ttCutoffs": self.ttCutoffs,
+            "ttStores": self.ttStores,
+            "betaCutoffs": list(self.betaCutoffs),
+            "researches": self.researches,
+            "aspirationFails": self.aspirationFails,
+            "ponderHit": self.ponderHit,
+            "branchingFactor": self.branchingFactor(),
+            "depth": self.depth,
+            "elapsed": self.elapsed,
+            "score": self.score,
+            "move": self.move,
+        }
+
+    def __str__(self):
+        return ("depth %d, %d nodes, %d leaves in %.3f s, branching %.2f, "
+            "tt %d hits / %d misses / %d stores, first move cutoffs %.0f%%, "
+            "%d re-searches, %d aspiration fails, %sresult %s %s" % (
+            self.depth, self.nodes, self.leaves, self.elapsed, self.branchingFactor(),
+            self.ttHits, self.ttMisses, self.ttStores, 100 * self.firstMoveCutoffRate(),
+            self.researches, self.aspirationFails, "ponder hit, " if self.ponderHit else "",
+            self.score, self.move))
@@ -0,0 +1,144 @@
+import argparse
+import ast
+import csv
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from FiveInRow import FiveInRow
+from FiveInRowPlayers import RandomPlayer, ShallowAiPlayer
+from GameRecord import GameWriter, encodeGame
+from MinimaxPlayer import MinimaxPlayer
+from Patterns import WIN_LENGTH
+
+PLAYERS = {
+    "random": RandomPlayer,
+    "shallow": ShallowAiPlayer,
+    "minimax": MinimaxPlayer,
+}
+
+FIELDS = ["game", "seed", "first", "winner", "moves", "moveTimes", "line"]
+
+def parsePlayer(spec):
+    """Parse a player spec like "minimax:depth=3,timeLimit=0.5" to (class, kwargs)"""
+    name, _, options = spec.partition(":")
+    if name not in PLAYERS:
+        raise ValueError("Unknown player %r, expected one of %s" % (name, ", ".join(PLAYERS)))
+
+    kwargs = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        try:
+            kwargs[key.strip()] = ast.literal_eval(value.strip())
+        except (SyntaxError, ValueError):
+            raise ValueError("Bad option %r in player spec %r" % (option, spec))
+    return PLAYERS[name], kwargs
+
+def makePlayer(spec):
+    cls, kwargs = parsePlayer(spec)
+    return cls(**kwargs)
+
+def parseOpening(text):
+    """Parse an opening like "7,7 8,8 6,7" to a list of moves"""
+    return [tuple(int(c) for c in move.split(",")) for move in text.split()]
+
+def formatMoves(moves):
+    return " ".join("%d,%d" % move for move in moves)
+
+def readOpenings(path):
+    with open(path) as f:
+        return [parseOpening(line) for line in f if line.strip() and not line.startswith("#")]
+
+def playGame(index, specs, opening, seed, alternate, size=15, winLength=WIN_LENGTH, record=False):
+    """Play one game without printing and return its result row.
+
+    With alternate set, the second player config moves first in every odd
+    game. The first and winner columns name the configs as 1 and 2, a
+    winner of 0 is a draw. With record set, the row also has the game
+    record as bytes, not written to the results file."""
+    random.seed(seed)
+    first = 2 if alternate and index % 2 else 1
+    order = [specs[0], specs[1]] if first == 1 else [specs[1], specs[0]]
+
+    game = FiveInRow(makePlayer(order[0]), makePlayer(order[1]), size, winLength)
+    game.playOpening(opening)
+    winner = game.play()
+    if winner and first == 2:
+        winner = 3 - winner
+
+    row = {
+        "game": index,
+        "seed": seed,
+        "first": first,
+        "winner": winner,
+        "moves": len(game.moves),
+        "moveTimes": " ".join("%.4f" % t for t in game.moveTimes),
+        "line": formatMoves(game.moves),
+    }
+    if record:
+        row["record"] = encodeGame(game, order)
+    return row
+
+def playGames(games, specs, openings=None, seed=1, alternate=True, workers=None, size=15, winLength=WIN_LENGTH,
+        record=False):
+    """Play the games across a process pool, yielding the result rows in game order"""
+    openings = openings or [[]]
+    tasks = [(index, specs, openings[index % len(openings)], seed + index, alternate, size, winLength, record)
+        for index in range(games)]
+
+    if workers == 1:
+        for task in tasks:
+            yield playGame(*task)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        chunk = max(1, games // (4 * (workers or os.cpu_count() or 1)))
+        yield from pool.map(playGame, *zip(*tasks), chunksize=chunk)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play games between two player configs without a UI")
+    parser.add_argument("player1", help='player spec, e.g. "minimax:depth=2" or "shallow"')
+    parser.add_argument("player2", help="player spec of the opponent")
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("-s", "--seed", type=int, default=1, help="seed of the first game, game i uses seed+i")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="processes, default is the CPU count")
+    parser.add_argument("-o", "--output", default="selfplay.csv")
+    parser.add_argument("--openings", help='file with one opening per line, e.g. "7,7 8,8"')
+    parser.add_argument("--no-alternate", dest="alternate", action="store_false",
+        help="let player1 move first in every game")
+    parser.add_argument("--size", type=int, default=15, help="board size")
+    parser.add_argument("--win-length", dest="winLength", type=int, default=WIN_LENGTH,
+        help="marks in a row needed to win")
+    parser.add_argument("-r", "--record", help="append the games to this game archive")
+    args = parser.parse_args(argv)
+
+    specs = (args.player1, args.player2)
+    for spec in specs:
+        parsePlayer(spec)
+    openings = readOpenings(args.openings) if args.openings else None
+
+    wins = [0, 0, 0]
+    moves = 0
+    start = time.perf_counter()
+    archive = GameWriter(args.record) if args.record else None
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        for row in playGames(args.games, specs, openings, args.seed, args.alternate, args.workers,
+                args.size, args.winLength, archive is not None):
+            if archive is not None:
+                archive.writeEncoded(row.pop("record"))
+            writer.writerow(row)
+            wins[row["winner"]] += 1
+            moves += row["moves"]
+    elapsed = time.perf_counter() - start
+    if archive is not None:
+        archive.close()
+
+    print("%s: %d  %s: %d  draws: %d" % (specs[0], wins[1], specs[1], wins[2], wins[0]))
+    print("%d games, %d moves in %.1f s, %.1f games/s" % (args.games, moves, elapsed, args.games / elapsed))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
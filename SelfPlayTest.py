@@ -0,0 +1,31 @@
+import unittest
+from FiveInRowPlayers import ShallowAiPlayer
+from MinimaxPlayer import MinimaxPlayer
+from SelfPlay import parsePlayer, parseOpening, playGame, playGames
+
+class SelfPlayTest(unittest.TestCase):
+
+    def test_parsePlayer(self):
+        self.assertEqual(parsePlayer("shallow"), (ShallowAiPlayer, {}))
+        self.assertEqual(parsePlayer("minimax:depth=2,timeLimit=0.5"),
+            (MinimaxPlayer, {"depth": 2, "timeLimit": 0.5}))
+        self.assertRaises(ValueError, parsePlayer, "alphazero")
+        self.assertRaises(ValueError, parsePlayer, "minimax:depth=0.5.5")
+        self.assertRaises(ValueError, parsePlayer, "minimax:depth=")
+
+    def test_opening(self):
+        opening = parseOpening("7,7 0,0 7,8")
+        row = playGame(0, ("shallow", "shallow"), opening, 1, False)
+        self.assertEqual(row["moves"], len(row["moveTimes"].split()) + len(opening))
+
+    def test_pool(self):
+        specs = ("minimax:depth=1", "random")
+        serial = list(playGames(6, specs, [[(7, 7)]], seed=3, workers=1))
+        pooled = list(playGames(6, specs, [[(7, 7)]], seed=3, workers=2))
+
+        key = lambda row: (row["game"], row["first"], row["winner"], row["moves"])
+        self.assertEqual(list(map(key, serial)), list(map(key, pooled)))
+        self.assertEqual([row["first"] for row in serial], [1, 2, 1, 2, 1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
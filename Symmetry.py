@@ -0,0 +1,47 @@
+from functools import lru_cache
+from Zobrist import zobristTable
+
+#the rotations and reflections of a square board: bit 2 swaps x and y,
+#then bit 0 mirrors x and bit 1 mirrors y
+SYMMETRIES = 8
+
+def transform(symmetry, x, y, size):
+    """Map the cell (x, y) by one of the symmetries"""
+    if symmetry & 4:
+        x, y = y, x
+    if symmetry & 1:
+        x = size - 1 - x
+    if symmetry & 2:
+        y = size - 1 - y
+    return x, y
+
+INVERSE = [next(t for t in range(SYMMETRIES) if transform(t, *transform(s, 0, 1, 5), 5) == (0, 1))
+    for s in range(SYMMETRIES)]
+
+@lru_cache(maxsize=None)
+def symmetricZobrist(size):
+    """Return the zobrist codes of each cell under all the symmetries as
+    table[player][y][x] = (code of symmetry 0, ..., code of symmetry 7)"""
+    zobrist = zobristTable(size)
+    table = [None]
+    for player in (1, 2):
+        table.append([[tuple(zobrist[player][ty][tx]
+            for tx, ty in (transform(s, x, y, size) for s in range(SYMMETRIES)))
+            for x in range(size)] for y in range(size)])
+    return table
+
+def symmetricHashes(board):
+    """Return the zobrist hash of the board under each symmetry"""
+    codes = symmetricZobrist(board.size)
+    hashes = [0] * SYMMETRIES
+    for x, y, mark in board.marks():
+        hashes = [h ^ c for h, c in zip(hashes, codes[mark][y][x])]
+    return hashes
+
+def canonicalHash(board):
+    """Return the smallest of the symmetric hashes of the board and the
+    symmetry giving it. Boards that are rotations or reflections of each
+    other have the same canonical hash."""
+    hashes = symmetricHashes(board)
+    symmetry = min(range(SYMMETRIES), key=hashes.__getitem__)
+    return hashes[symmetry], symmetry
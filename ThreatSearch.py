@@ -0,0 +1,207 @@
+import time
+from Board import codeString
+from Patterns import WIN_LENGTH
+
+class ThreatSearch:
+    """Search for forced wins among threat moves only.
+
+    A VCF (victory by continuous fours) plays only fours, each answered by
+    the one move that stops the five. A VCT also plays threes, answered by
+    every move that stops the open four and by the defender's own fours.
+    With a longer win length, a five is the winning row and a four and a
+    three are one and two marks short of it. The search makes and takes
+    back moves on a MinimaxStatus.
+
+    A found win is sound: every defence considered loses and the ones not
+    considered lose to a five or an open four. Not finding one does not
+    mean there is none."""
+
+    def __init__(self, status, maxNodes=20000, timeLimit=None):
+        self.status = status
+        self.maxNodes = maxNodes
+        self.timeLimit = timeLimit
+        self.deadline = None
+        self.nodeNo = 0
+        self.failed = {}
+        self.shapesHash = None
+        self.shapes = []
+        self.shapeCache = shapeCaches.setdefault(status.winLength, {})
+
+    def vcf(self, player, maxDepth=20):
+        """Return a winning line of fours for the player to move as a list of
+        moves, the opponent's replies in between, or None"""
+        return self.search(player, maxDepth, False)
+
+    def vct(self, player, maxDepth=6):
+        """Return a winning line of fours and threes for the player to move,
+        following one of the defences, or None"""
+        return self.search(player, maxDepth, True)
+
+    def search(self, player, maxDepth, threes):
+        self.nodeNo = 0
+        self.failed = {}
+        self.deadline = None if self.timeLimit is None else time.monotonic() + self.timeLimit
+        return self.attack(player, maxDepth, threes)
+
+    def outOfBudget(self):
+        self.nodeNo += 1
+        if self.nodeNo > self.maxNodes:
+            return True
+        return self.deadline is not None and self.nodeNo & 0x3f == 0 and time.monotonic() > self.deadline
+
+    def attack(self, player, depth, threes):
+        status = self.status
+        opponent = 3 - player
+
+        wins = self.completions(player)
+        if wins:
+            return [min(wins)]
+        if depth == 0 or self.outOfBudget():
+            return None
+
+        key = (status.key(), threes)
+        if self.failed.get(key, -1) >= depth:
+            return None
+
+        #a four of the opponent has to be blocked first, and two can not be
+        blocks = self.completions(opponent)
+        if len(blocks) > 1:
+            return None
+
+        fours = self.fourMoves(player)
+        moves = sorted(fours, key=lambda move: -len(fours[move]))
+        if threes:
+            moves += [move for move in self.threeMoves(player) if move not in fours]
+        if blocks:
+            moves = [move for move in moves if move in blocks]
+
+        for move in moves:
+            status.update(*move, player)
+            line = self.defend(player, fours.get(move), depth, threes)
+            status.undo()
+            if line is not None:
+                return [move] + line
+
+        self.failed[key] = depth
+        return None
+
+    def defend(self, player, wins, depth, threes):
+        """Return the winning line after the player's threat move, or None if
+        the opponent can hold"""
+        opponent = 3 - player
+        if self.completions(opponent):
+            return None
+
+        if wins is not None:
+            #a four, two ways to make five can not both be blocked
+            wins = sorted(wins)
+            if len(wins) > 1:
+                return wins[:2]
+            replies = wins
+        else:
+            #a three, the opponent can block the open four or make fours of its own
+            replies = sorted(self.threeDefences(player) | set(self.fourMoves(opponent)))
+
+        line = None
+        for reply in replies:
+            self.status.update(*reply, opponent)
+            result = self.attack(player, depth - 1, threes)
+            self.status.undo()
+            if result is None:
+                return None
+            if line is None:
+                line = [reply] + result
+        return line
+
+    def lineShapes(self, kind):
+        """Yield the cells of each line with shapes of the kind, with the
+        shapes as (None, shapes of player 1, shapes of player 2)"""
+        status = self.status
+        if self.shapesHash != status.hash:
+            #lines with any shapes are collected once for each position
+            self.shapesHash = status.hash
+            self.shapes = []
+            lines = status.lines
+            cache = self.shapeCache
+            for i, code in enumerate(status.lineCodes):
+                shapes = cache.get(code)
+                if shapes is None:
+                    if len(cache) >= SHAPE_CACHE_SIZE:
+                        cache.clear()
+                    shapes = cache[code] = evaluateShapes(codeString(code), status.winLength)
+                if shapes:
+                    self.shapes.append((lines[i], shapes))
+
+        for cells, shapes in self.shapes:
+            if shapes[kind] is not None:
+                yield cells, shapes[kind]
+
+    def completions(self, player):
+        """Empty cells where the player would make five"""
+        return {cells[k] for cells, shapes in self.lineShapes(FIVES) for k in shapes[player]}
+
+    def fourMoves(self, player):
+        """Return the moves making a four for the player, as a dict from the
+        move to the cells where the player could then make five"""
+        moves = {}
+        for cells, shapes in self.lineShapes(FOURS):
+            for a, b in shapes[player]:
+                moves.setdefault(cells[a], set()).add(cells[b])
+                moves.setdefault(cells[b], set()).add(cells[a])
+        return moves
+
+    def threeMoves(self, player):
+        """Moves making an open three, one move away from an open four"""
+        moves = {}
+        for cells, shapes in self.lineShapes(THREES):
+            for k in shapes[player]:
+                moves[cells[k]] = True
+        return list(moves)
+
+    def threeDefences(self, player):
+        """Cells that stop the player's open threes from becoming open fours"""
+        return {cells[k] for cells, shapes in self.lineShapes(DEFENCES) for k in shapes[player]}
+
+#threat shapes of recently seen lines by line code, by win length
+FIVES, FOURS, THREES, DEFENCES = range(4)
+shapeCaches = {}
+SHAPE_CACHE_SIZE = 2**18
+
+def evaluateShapes(line, winLength=WIN_LENGTH):
+    """Find the threat shapes of both players on a line. Returns () if
+    there are none, otherwise for each kind None if neither player has it or
+    (None, offsets of player 1, offsets of player 2). Fours are pairs of
+    offsets, either of which makes a four that the other one turns into five."""
+    #windows of a win length make fives and fours, open windows one longer
+    #with empty ends make threes
+    n = winLength
+    shapes = [[None, [], []] for kind in range(4)]
+    for player in (1, 2):
+        mark = str(player)
+        if line.count(mark) < n - 3:
+            continue
+
+        for start in range(len(line) - n + 1):
+            window = line[start:start + n]
+            marks, empty = window.count(mark), window.count('0')
+            if marks == n - 1 and empty == 1:
+                shapes[FIVES][player].append(start + window.index('0'))
+            elif marks == n - 2 and empty == 2:
+                a = window.index('0')
+                shapes[FOURS][player].append((start + a, start + window.index('0', a + 1)))
+
+        for start in range(len(line) - n):
+            window = line[start:start + n + 1]
+            if window[0] != '0' or window[n] != '0':
+                continue
+            inner = window[1:n]
+            marks, empty = inner.count(mark), inner.count('0')
+            if marks == n - 3 and empty == 2:
+                shapes[THREES][player].extend(start + 1 + k for k, c in enumerate(inner) if c == '0')
+            elif marks == n - 2 and empty == 1:
+                shapes[DEFENCES][player].extend(start + k for k, c in enumerate(window) if c == '0')
+
+    shapes = tuple(kind if kind[1] or kind[2] else None for kind in shapes)
+    if shapes == (None,) * 4:
+        shapes = ()
+    return shapes
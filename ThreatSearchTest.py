@@ -0,0 +1,85 @@
+import unittest
+from Benchmark import gameAt, randomPositions
+from Bitboard import Bitboard
+from Board import Board
+from MinimaxPlayer import MinimaxPlayer, MinimaxStatus
+from ThreatSearch import ThreatSearch
+
+class ThreatSearchTest(unittest.TestCase):
+
+    def checkLine(self, board, player, line, winLength=5):
+        """Play the line out, checking that each reply was the only block"""
+        board = board.copy()
+        bitboard = Bitboard.fromBoard(board, winLength)
+        for k, (x, y) in enumerate(line):
+            mark = player if k % 2 == 0 else 3 - player
+            self.assertEqual(board.get(x, y), 0)
+            if k % 2 == 1:
+                blocks = ThreatSearch(MinimaxStatus(board, 0, winLength=winLength)).completions(player)
+                self.assertIn((x, y), blocks)
+                #only the last block can leave a second five to make
+                if k < len(line) - 2:
+                    self.assertEqual(len(blocks), 1)
+            board.set(x, y, mark)
+            bitboard.place(x, y, mark)
+            self.assertEqual(bitboard.winsAt(x, y), k == len(line) - 1)
+
+    def test_vcf(self):
+        longest = 0
+        for seed in range(40):
+            board = randomPositions(1, 40, seed=seed)[0]
+            bitboard = Bitboard.fromBoard(board)
+            if bitboard.hasFive(1) or bitboard.hasFive(2):
+                continue
+
+            status = MinimaxStatus(board, 0)
+            search = ThreatSearch(status)
+            for player in [1, 2]:
+                line = search.vcf(player)
+                self.assertEqual(len(status.history), 40)
+                if line is not None:
+                    self.checkLine(board, player, line)
+                    longest = max(longest, len(line))
+
+        self.assertGreaterEqual(longest, 15)
+
+    def test_vct(self):
+        board = Board(15)
+        for x, y in [(5, 7), (6, 7), (7, 5), (7, 6)]:
+            board.set(x, y, 1)
+        for x, y in [(0, 0), (14, 14), (0, 14), (14, 0)]:
+            board.set(x, y, 2)
+
+        search = ThreatSearch(MinimaxStatus(board, 0))
+        self.assertIsNone(search.vcf(1))
+        line = search.vct(1)
+        self.assertIsNotNone(line)
+        self.assertIsNone(search.vct(2))
+
+    def test_winLength(self):
+        board = Board(19)
+        for x in range(5, 9):
+            board.set(x, 7, 1)
+        board.set(10, 7, 2)
+
+        #four in a row makes five at once, or when six wins, a double four
+        self.assertEqual(ThreatSearch(MinimaxStatus(board, 0)).vcf(1), [(4, 7)])
+        line = ThreatSearch(MinimaxStatus(board, 0, winLength=6)).vcf(1)
+        self.assertEqual(len(line), 3)
+        self.checkLine(board, 1, line, 6)
+
+        #blocked on both sides there is no room for six
+        board.set(4, 7, 2)
+        self.assertIsNotNone(ThreatSearch(MinimaxStatus(board, 0)).vcf(1))
+        self.assertIsNone(ThreatSearch(MinimaxStatus(board, 0, winLength=6)).vcf(1))
+
+    def test_minimaxPlayer(self):
+        board = randomPositions(1, 40, seed=1)[0]
+        line = ThreatSearch(MinimaxStatus(board, 0)).vcf(1)
+
+        player = MinimaxPlayer(1)
+        gameAt(board, player)
+        self.assertEqual(player.requestMove(), line[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+from array import array
+
+#bound types of stored scores, 0 marks an empty slot
+EXACT, LOWER, UPPER = 1, 2, 3
+
+#bytes per slot: 64 bit key, 32 bit check value and 64 bits of packed data
+SLOT_BYTES = 20
+TABLE_MEMORY = 16 * 2**20
+
+SCORE_BITS = 20
+SCORE_OFFSET = 1 << (SCORE_BITS - 1)
+AGE_MASK = 0xff
+
+class TranspositionTable:
+    """Fixed size table of search results.
+
+    Every bucket has two slots: the first one keeps the deepest result of
+    the current search and the second one is always replaced."""
+
+    def __init__(self, memory=TABLE_MEMORY):
+        buckets = 1
+        while buckets * 4 * SLOT_BYTES <= memory:
+            buckets *= 2
+
+        self.mask = buckets - 1
+        self.age = 0
+        self.clear()
+
+    def __len__(self):
+        """Number of stored results"""
+        return len(self.data) - self.data.count(0)
+
+    def capacity(self):
+        return len(self.data)
+
+    def newSearch(self):
+        """Mark the results of earlier searches as replaceable"""
+        self.age = (self.age + 1) & AGE_MASK
+
+    def clear(self):
+        slots = 2 * (self.mask + 1)
+        self.keys = array('Q', [0]) * slots
+        self.checks = array('I', [0]) * slots
+        self.data = array('Q', [0]) * slots
+
+    def find(self, key, check):
+        slot = 2 * (key & self.mask)
+        for i in (slot, slot + 1):
+            if self.data[i] and self.keys[i] == key and self.checks[i] == check:
+                return i
+        return -1
+
+    def probe(self, key, check):
+        """Return (score, depth, bound, move) stored for the position or None"""
+        i = self.find(key, check)
+        if i < 0:
+            return None
+
+        data = self.data[i]
+        move = (data >> 16) & 0xffff
+        return (
+            (data >> 44) - SCORE_OFFSET,
+            (data >> 8) & 0xff,
+            (data >> 32) & 0x3,
+            None if move == 0 else ((move - 1) >> 8, (move - 1) & 0xff)
+        )
+
+    def store(self, key, check, score, depth, bound, move):
+        move = 0 if move is None else ((move[0] << 8) | move[1]) + 1
+        data = ((score + SCORE_OFFSET) << 44 | bound << 32 | move << 16
+            | min(depth, 0xff) << 8 | self.age)
+
+        slot = 2 * (key & self.mask)
+        i = self.find(key, check)
+
+        if i == slot:
+            if not self.preferred(slot, depth):
+                #keep the deeper result of this search for the position
+                return
+        elif self.preferred(slot, depth):
+            #the replaced result still gets a second chance in the other slot,
+            #where a result of the same position found there is dropped
+            self.keys[slot + 1] = self.keys[slot]
+            self.checks[slot + 1] = self.checks[slot]
+            self.data[slot + 1] = self.data[slot]
+            i = slot
+        elif i < 0:
+            i = slot + 1
+
+        self.keys[i] = key
+        self.checks[i] = check
+        self.data[i] = data
+
+    def preferred(self, slot, depth):
+        """Whether a result of given depth may replace the first slot of a bucket"""
+        data = self.data[slot]
+        return data == 0 or (data & AGE_MASK) != self.age or depth >= (data >> 8) & 0xff
@@ -0,0 +1,82 @@
+import unittest
+from TranspositionTable import TranspositionTable, EXACT, LOWER, UPPER, SLOT_BYTES
+
+class TranspositionTableTest(unittest.TestCase):
+
+    def test_probe(self):
+        tt = TranspositionTable(2**16)
+
+        tt.store(12345, 99, -900, 4, UPPER, (3, 14))
+        tt.store(54321, 7, 800, 1, LOWER, None)
+
+        self.assertEqual(tt.probe(12345, 99), (-900, 4, UPPER, (3, 14)))
+        self.assertEqual(tt.probe(54321, 7), (800, 1, LOWER, None))
+
+        #moves on boards up to the largest size keep their coordinates
+        tt.store(777, 1, 0, 2, EXACT, (254, 3))
+        tt.store(778, 1, 0, 2, EXACT, (254, 254))
+        self.assertEqual(tt.probe(777, 1)[3], (254, 3))
+        self.assertEqual(tt.probe(778, 1)[3], (254, 254))
+
+        #a matching key with another check value is a collision
+        self.assertIsNone(tt.probe(12345, 98))
+        self.assertIsNone(tt.probe(1, 0))
+
+    def test_memory(self):
+        tt = TranspositionTable(2**20)
+        self.assertLessEqual(tt.capacity() * SLOT_BYTES, 2**20)
+        self.assertGreater(tt.capacity() * SLOT_BYTES * 2, 2**20)
+
+        self.assertEqual(len(tt), 0)
+        tt.store(1, 0, 0, 1, EXACT, None)
+        tt.store(2, 0, 0, 1, EXACT, None)
+        tt.store(2, 0, 5, 3, EXACT, None)
+        self.assertEqual(len(tt), 2)
+
+    def test_replacement(self):
+        tt = TranspositionTable(2**10)
+        buckets = tt.mask + 1
+        keys = [5 + i * buckets for i in range(3)]
+
+        tt.store(keys[0], 0, 10, 6, EXACT, (1, 1))
+        tt.store(keys[1], 0, 20, 2, EXACT, (2, 2))
+        tt.store(keys[2], 0, 30, 1, EXACT, (3, 3))
+
+        #the deep result stays, the shallow ones share the other slot
+        self.assertEqual(tt.probe(keys[0], 0)[0], 10)
+        self.assertIsNone(tt.probe(keys[1], 0))
+        self.assertEqual(tt.probe(keys[2], 0)[0], 30)
+
+        #results of earlier searches give way to new ones
+        tt.newSearch()
+        tt.store(keys[1], 0, 20, 2, EXACT, (2, 2))
+        self.assertEqual(tt.probe(keys[1], 0)[0], 20)
+        self.assertEqual(tt.probe(keys[0], 0)[0], 10)
+        self.assertIsNone(tt.probe(keys[2], 0))
+
+    def test_sameKey(self):
+        tt = TranspositionTable(2**10)
+        buckets = tt.mask + 1
+        keys = [5 + i * buckets for i in range(3)]
+
+        #a shallower result of a position in the first slot does not evict the second slot
+        tt.store(keys[0], 0, 10, 6, EXACT, (1, 1))
+        tt.store(keys[1], 0, 20, 2, EXACT, (2, 2))
+        tt.store(keys[0], 0, 11, 1, EXACT, (1, 2))
+        self.assertEqual(tt.probe(keys[0], 0), (10, 6, EXACT, (1, 1)))
+        self.assertEqual(tt.probe(keys[1], 0)[0], 20)
+
+        #a deeper result of a position in the second slot moves it to the first
+        tt.store(keys[1], 0, 21, 8, EXACT, (2, 3))
+        self.assertEqual(tt.probe(keys[1], 0), (21, 8, EXACT, (2, 3)))
+        self.assertEqual(tt.find(keys[1], 0), 2 * 5)
+        self.assertEqual(tt.probe(keys[0], 0)[0], 10)
+
+        #a position in the second slot not deep enough for the first is updated in place
+        tt.store(keys[2], 0, 30, 1, EXACT, None)
+        tt.store(keys[2], 0, 31, 2, LOWER, None)
+        self.assertEqual(tt.probe(keys[2], 0), (31, 2, LOWER, None))
+        self.assertEqual(len(tt), 2)
+
+if __name__ == '__main__':
+    unittest.main()
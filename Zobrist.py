@@ -0,0 +1,14 @@
+import random
+from functools import lru_cache
+
+#zobrist codes carry a 64 bit hash key and a 32 bit check value above it
+HASH_BITS = 64
+HASH_MASK = (1 << HASH_BITS) - 1
+ZOBRIST_SEED = 5
+
+@lru_cache(maxsize=None)
+def zobristTable(size):
+    """Return the zobrist codes of both players' marks as table[player][y][x]"""
+    rng = random.Random(ZOBRIST_SEED * 1000 + size)
+    codes = lambda: [[rng.getrandbits(HASH_BITS + 32) for x in range(size)] for y in range(size)]
+    return [None, codes(), codes()]